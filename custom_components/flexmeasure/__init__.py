@@ -5,6 +5,9 @@ For more details about this integration, please refer to
 https://github.com/custom-components/ha-flexmeasure
 """
 import logging
+from datetime import datetime
+from typing import Any
+from typing import Mapping
 
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
@@ -15,101 +18,230 @@ from homeassistant.core import callback
 from homeassistant.core import Config
 from homeassistant.core import CoreState
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import entity_registry as er
-from homeassistant.helpers.storage import Store
 from homeassistant.helpers.template import Template
 from homeassistant.util import dt as dt_util
 
+from .batch import is_available as batch_available
+from .batch import MeterBatch
+from .const import CONF_BATCH
 from .const import CONF_CONDITION
 from .const import CONF_CRON
+from .const import CONF_JOURNAL
+from .const import CONF_LAZY
 from .const import CONF_METER_TYPE
+from .const import CONF_MIN_INTERVAL
+from .const import CONF_REDUCE_RECORDING
+from .const import CONF_REFRESH_INTERVAL
+from .const import CONF_SAVE_INTERVAL
 from .const import CONF_SENSORS
+from .const import CONF_SHARED_STORE
 from .const import CONF_SOURCE
+from .const import CONF_SOURCES
+from .const import CONF_TIME_WINDOWS
+from .const import CONF_TRACK_SOURCE
 from .const import CONF_TW_DAYS
 from .const import CONF_TW_FROM
 from .const import CONF_TW_TILL
 from .const import COORDINATOR
+from .const import DEFAULT_MIN_INTERVAL
+from .const import DEFAULT_REFRESH_INTERVAL
+from .const import DEFAULT_SAVE_INTERVAL
 from .const import DOMAIN
 from .const import DOMAIN_DATA
 from .const import METER_TYPE_SOURCE
 from .const import METER_TYPE_TIME
+from .const import OPTIONS
+from .const import PRELOADS
+from .const import RECONFIGURABLE_OPTIONS
+from .const import SOURCES
 from .const import STORE
+from .const import TIME_WINDOW_OPTIONS
 from .coordinator import FlexMeasureCoordinator
+from .journal import async_remove_journal
+from .journal import Journal
+from .journal import journal_path
+from .journal import JournalReplay
+from .meter import LazyTimeMeter
 from .meter import Meter
 from .period import Period
+from .sensor import async_add_sensors
+from .sensor import async_remove_sensors
+from .source import SourceTracker
+from .store import async_get_domain_store
+from .store import EntryStore
+from .store import MeterStore
+from .store import UnsharedStore
 from .time_window import TimeWindow
+from .util import invalid_sources
+from .util import source_sensors
 
-STORAGE_VERSION = 1
 STORAGE_KEY_TEMPLATE = "{domain}_{entry_id}"
 
+# the entries are set up in the UI, only settings of the whole integration are in YAML
+CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Optional(DOMAIN): vol.Schema(
+            {vol.Optional(CONF_REDUCE_RECORDING, default=False): cv.boolean}
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
 async def async_setup(hass: HomeAssistant, config: Config):
-    """Set up this integration using YAML is not supported."""
+    """Set up this integration using YAML is not supported, apart from its settings.
+
+    The state of all entries starts loading here, so it's loaded concurrently and
+    ready by the time an entry is set up.
+    """
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    domain_data[CONF_REDUCE_RECORDING] = config.get(DOMAIN, {}).get(
+        CONF_REDUCE_RECORDING, False
+    )
+    preloads = domain_data.setdefault(PRELOADS, {})
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.disabled_by is None:
+            store = _create_store(hass, entry)
+            preloads[entry.entry_id] = (
+                store,
+                hass.async_create_task(store.async_load()),
+            )
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up this integration using UI."""
 
+    # entries that are set up at startup started loading already
+    preloads = hass.data.get(DOMAIN_DATA, {}).get(PRELOADS, {})
+    store, preload = preloads.pop(entry.entry_id, None) or (
+        _create_store(hass, entry),
+        None,
+    )
+
     config_name: str = entry.options[CONF_NAME]
     meter_type: str = entry.options[CONF_METER_TYPE]
-    condition: str | None = entry.options.get(CONF_CONDITION)
+    tracked_sources: list[str] | None = None
+    tracker: SourceTracker | None = None
+    meter_sources: dict[str, str] | None = None
+    lazy: bool = _is_lazy(entry.options)
 
     def get_time_value():
         return dt_util.utcnow().timestamp()
 
     def get_source_value():
-        return hass.states.get(source_entity).state
+        return tracker.reading(source_entity)
+
+    def get_source_values():
+        # all sources are read at once, so their meters are updated in one pass
+        return tracker.readings()
 
     if meter_type == METER_TYPE_TIME:
         value_callback = get_time_value
     elif meter_type == METER_TYPE_SOURCE:
         registry = er.async_get(hass)
+        sources: list[str] = entry.options.get(CONF_SOURCES) or [
+            entry.options[CONF_SOURCE]
+        ]
+        source_entities: dict[str, str] = {}
 
-        try:
-            source_entity = er.async_validate_entity_id(
-                registry, entry.options[CONF_SOURCE]
-            )
-        except vol.Invalid:
-            # The entity is identified by an unknown entity registry ID
+        if invalid := invalid_sources(entry.options.get(CONF_SOURCES) or []):
             _LOGGER.error(
-                "%s # Failed to setup FlexMeasure for unknown entity %s",
+                "%s # Failed to setup FlexMeasure, sources need an entity id with an "
+                "object id of their own: %s",
                 config_name,
-                entry.options[CONF_SOURCE],
+                ", ".join(invalid),
             )
             return False
 
-        value_callback = get_source_value
-
-    if condition:
-        condition = Template(condition)
-        condition.ensure_valid()
-
-    store = Store(
-        hass,
-        STORAGE_VERSION,
-        STORAGE_KEY_TEMPLATE.format(domain=DOMAIN, entry_id=entry.entry_id),
-    )
-
-    time_window = TimeWindow(
-        entry.options[CONF_TW_DAYS],
-        entry.options[CONF_TW_FROM],
-        entry.options[CONF_TW_TILL],
-    )
+        for source in sources:
+            try:
+                source_entities[source] = er.async_validate_entity_id(registry, source)
+            except vol.Invalid:
+                # The entity is identified by an unknown entity registry ID
+                _LOGGER.error(
+                    "%s # Failed to setup FlexMeasure for unknown entity %s",
+                    config_name,
+                    source,
+                )
+                return False
+
+        if entry.options.get(CONF_SOURCES):
+            value_callback = get_source_values
+            meter_sources = {}
+        else:
+            source_entity = source_entities[sources[0]]
+            value_callback = get_source_value
+        if entry.options.get(CONF_TRACK_SOURCE):
+            tracked_sources = list(source_entities.values())
+        # keeps the parsed state of the sources, so updates don't parse them
+        tracker = SourceTracker(hass, source_entities.values())
+
+    condition = _create_condition(entry.options)
+    time_window = _create_time_window(entry.options)
+
+    batch: MeterBatch | None = None
+    if entry.options.get(CONF_BATCH, False):
+        if lazy:
+            _LOGGER.warning(
+                "%s # Lazy meters aren't updated in batches, ignoring the batch option",
+                config_name,
+            )
+        elif meter_sources is not None:
+            # a batch is updated with a single reading, so not for several sources
+            _LOGGER.warning(
+                "%s # Several sources aren't updated in batches, ignoring the batch option",
+                config_name,
+            )
+        elif batch_available():
+            batch = MeterBatch(len(entry.options[CONF_SENSORS]))
+        else:
+            _LOGGER.warning(
+                "%s # Batch updates require numpy, updating meters one by one",
+                config_name,
+            )
 
     meters = {}
     now = dt_util.now()
 
-    for sensor in entry.options[CONF_SENSORS]:
-        period = Period(sensor[CONF_CRON], now)
-        meters[sensor[CONF_NAME]] = Meter(f"{config_name}_{sensor[CONF_NAME]}", period)
+    for source, sensor in source_sensors(entry.options):
+        if batch:
+            meter = batch.add(
+                f"{config_name}_{sensor[CONF_NAME]}", Period(sensor[CONF_CRON], now)
+            )
+        else:
+            meter = _create_meter(entry.options, sensor, now)
+        meters[sensor[CONF_NAME]] = meter
+        if source:
+            meter_sources[meter.name] = source_entities[source]
 
     coordinator = FlexMeasureCoordinator(
-        hass, config_name, store, meters, condition, time_window, value_callback
+        hass,
+        config_name,
+        store,
+        meters,
+        condition,
+        time_window,
+        value_callback,
+        save_interval=entry.options.get(CONF_SAVE_INTERVAL, DEFAULT_SAVE_INTERVAL),
+        source_entities=tracked_sources,
+        min_interval=entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+        lazy=lazy,
+        refresh_interval=entry.options.get(
+            CONF_REFRESH_INTERVAL, DEFAULT_REFRESH_INTERVAL
+        ),
+        batch=batch,
+        meter_sources=meter_sources,
     )
-    await coordinator.async_init()
+    if tracker:
+        # before the coordinator starts, so it reads states that just changed
+        tracker.async_start()
+        entry.async_on_unload(tracker.async_stop)
+    await coordinator.async_init(preload)
 
     @callback
     async def run_start(event):
@@ -123,6 +255,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     hass.data.setdefault(DOMAIN_DATA, {})[entry.entry_id] = {
         COORDINATOR: coordinator,
         STORE: store,
+        OPTIONS: dict(entry.options),  # the options the entry runs with
+        SOURCES: tracker,
     }
     await hass.config_entries.async_forward_entry_setups(entry, ([Platform.SENSOR]))
 
@@ -130,9 +264,131 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     return True
 
 
+def _create_store(hass: HomeAssistant, entry: ConfigEntry):
+    key = STORAGE_KEY_TEMPLATE.format(domain=DOMAIN, entry_id=entry.entry_id)
+    if entry.options.get(CONF_SHARED_STORE, False):
+        # the entry file is only read to move its data into the shared file
+        store = EntryStore(
+            async_get_domain_store(hass), entry.entry_id, MeterStore(hass, key)
+        )
+    else:
+        # and the other way around, when the entry stopped sharing the file
+        store = UnsharedStore(hass, key, entry.entry_id)
+    if entry.options.get(CONF_JOURNAL, False):
+        # the store holds the snapshot the journal is replayed on
+        store = Journal(hass, store, journal_path(hass, entry.entry_id))
+    else:
+        # the journal of an entry that stopped keeping one is replayed once
+        store = JournalReplay(hass, store, journal_path(hass, entry.entry_id))
+    return store
+
+
+def _is_lazy(options: Mapping[str, Any]) -> bool:
+    return options[CONF_METER_TYPE] == METER_TYPE_TIME and options.get(CONF_LAZY, False)
+
+
+def _create_meter(
+    options: Mapping[str, Any], sensor: dict[str, Any], now: datetime
+) -> Meter:
+    meter_class = LazyTimeMeter if _is_lazy(options) else Meter
+    return meter_class(
+        f"{options[CONF_NAME]}_{sensor[CONF_NAME]}", Period(sensor[CONF_CRON], now)
+    )
+
+
+def _create_condition(options: Mapping[str, Any]) -> Template | None:
+    condition: str | None = options.get(CONF_CONDITION)
+    if not condition:
+        return None
+    template = Template(condition)
+    template.ensure_valid()
+    return template
+
+
+def _create_time_window(options: Mapping[str, Any]) -> TimeWindow:
+    return TimeWindow(
+        options[CONF_TW_DAYS],
+        options[CONF_TW_FROM],
+        options[CONF_TW_TILL],
+        [
+            (window[CONF_TW_DAYS], window[CONF_TW_FROM], window[CONF_TW_TILL])
+            for window in options.get(CONF_TIME_WINDOWS, [])
+        ],
+    )
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Update listener, called when the config entry options are changed."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Update listener, called when the config entry options are changed.
+
+    Changes of the sensors, condition and time windows are applied to the running
+    entry, so the meters that didn't change keep measuring. Any other change
+    reloads the entry.
+    """
+    entry_data = hass.data[DOMAIN_DATA][entry.entry_id]
+    applied = entry_data[OPTIONS]
+    changed = {
+        key
+        for key in applied.keys() | entry.options.keys()
+        if applied.get(key) != entry.options.get(key)
+    }
+    if not changed:
+        return
+    if not changed <= RECONFIGURABLE_OPTIONS or (
+        # the arrays of a batch have a fixed size, and the sensors of several
+        # sources are repeated for every source
+        CONF_SENSORS in changed
+        and (applied.get(CONF_BATCH, False) or applied.get(CONF_SOURCES))
+    ):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    coordinator: FlexMeasureCoordinator = entry_data[COORDINATOR]
+    if CONF_CONDITION in changed:
+        coordinator.async_set_condition(_create_condition(entry.options))
+    if changed & TIME_WINDOW_OPTIONS:
+        coordinator.set_time_window(_create_time_window(entry.options))
+    if CONF_SENSORS in changed:
+        await _async_reconfigure_sensors(
+            hass, entry, coordinator, applied[CONF_SENSORS]
+        )
+    entry_data[OPTIONS] = dict(entry.options)
+    await coordinator.async_refresh()
+    _LOGGER.debug(
+        "%s # Applied changed options: %s", coordinator.name, ", ".join(sorted(changed))
+    )
+
+
+async def _async_reconfigure_sensors(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: FlexMeasureCoordinator,
+    applied: list[dict[str, Any]],
+) -> None:
+    old = {sensor[CONF_NAME]: sensor for sensor in applied}
+    new = {sensor[CONF_NAME]: sensor for sensor in entry.options[CONF_SENSORS]}
+    # a sensor that changed is replaced, its meter only when its period changed
+    removed = [name for name, sensor in old.items() if new.get(name) != sensor]
+    await async_remove_sensors(hass, entry, removed)
+
+    now = dt_util.now()
+    for name in removed:
+        sensor = new.get(name)
+        if sensor and sensor[CONF_CRON] == old[name][CONF_CRON]:
+            continue
+        meter = coordinator.remove_meter(name)
+        if sensor:
+            replacement = _create_meter(entry.options, sensor, now)
+            if meter.state:
+                # like after a reload, it continues from the state of the old meter
+                Meter.from_dict(Meter.to_dict(meter), replacement)
+            coordinator.add_meter(name, replacement)
+    for name, sensor in new.items():
+        if name not in old:
+            coordinator.add_meter(name, _create_meter(entry.options, sensor, now))
+
+    async_add_sensors(
+        hass, entry, [sensor for name, sensor in new.items() if old.get(name) != sensor]
+    )
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -150,4 +406,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 
 async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    pass
+    # the entry may have shared the file or kept a journal before, without its data
+    # being moved out
+    await async_get_domain_store(hass).async_remove_entry(entry.entry_id)
+    await async_remove_journal(hass, entry.entry_id)
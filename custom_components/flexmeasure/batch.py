@@ -0,0 +1,223 @@
+"""Meters of a coordinator kept in parallel arrays and updated in one pass.
+
+A heartbeat or condition change is applied to every meter with a few vectorized
+operations, so its cost hardly grows with the number of meters. Only meters with
+a due reset are visited one by one, as their next boundary comes from cron.
+
+Requires numpy, which is optional. Without it the coordinator updates its meters
+one by one.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime
+
+from .meter import Meter
+from .meter import MeterState
+from .meter import STATES
+from .period import Period
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+MEASURING = STATES.index(MeterState.MEASURING)
+WAITING_FOR_CONDITION = STATES.index(MeterState.WAITING_FOR_CONDITION)
+WAITING_FOR_TIME_WINDOW = STATES.index(MeterState.WAITING_FOR_TIME_WINDOW)
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+class MeterBatch:
+    """The state of a fixed number of meters, one array per attribute.
+
+    Meters are added with add, which returns a BatchMeter that reads and writes
+    its position in the arrays.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.meters: list[BatchMeter] = []
+        self.measured = np.zeros(size)
+        self.prev_measured = np.zeros(size)
+        self.session_start = np.full(size, np.nan)  # nan when not set
+        self.start_measured = np.full(size, np.nan)
+        self.state = np.zeros(size, dtype=np.int8)
+        self.template_active = np.zeros(size, dtype=bool)
+        self.tw_active = np.zeros(size, dtype=bool)
+        self.dirty = np.zeros(size, dtype=bool)
+        self.next_reset = np.full(size, np.inf)
+
+    def add(self, name: str, period: Period) -> BatchMeter:
+        meter = BatchMeter(name, period, self, len(self.meters))
+        self.meters.append(meter)
+        return meter
+
+    def sync(self) -> None:
+        """Take over the next reset of every period, after they were restored."""
+        for meter in self.meters:
+            self.next_reset[meter.index] = meter._period.end_timestamp
+
+    @property
+    def next_reset_timestamp(self) -> float:
+        return float(self.next_reset.min()) if self.meters else math.inf
+
+    def any_measuring(self) -> bool:
+        return bool((self.state == MEASURING).any())
+
+    def pop_dirty(self) -> dict[str, dict]:
+        """Return Meter.to_dict of every dirty meter by name, and clear the flags.
+
+        The values are converted from the arrays at once, rather than meter by
+        meter.
+        """
+        indices = np.flatnonzero(self.dirty)
+        if not len(indices):
+            return {}
+        self.dirty[indices] = False
+        data = {}
+        for index, measured, start, prev, session_start, state in zip(
+            indices.tolist(),
+            self.measured[indices].tolist(),
+            self.start_measured[indices].tolist(),
+            self.prev_measured[indices].tolist(),
+            self.session_start[indices].tolist(),
+            self.state[indices].tolist(),
+        ):
+            meter = self.meters[index]
+            data[meter.name] = {
+                "measured_value": measured,
+                "start_measured_value": None if math.isnan(start) else start,
+                "prev_measured_value": prev,
+                "session_start_reading": (
+                    None if math.isnan(session_start) else session_start
+                ),
+                "last_reset": meter._period.last_reset_timestamp,
+                "state": STATES[state],
+            }
+        return data
+
+    def on_heartbeat(self, tznow: datetime, reading: float, tw_active: bool):
+        self._update(reading)
+        self._reset_due(tznow, reading)
+        self.tw_active[:] = tw_active
+        self._update_state(reading)
+
+    def on_template_change(
+        self, tznow: datetime, reading: float, tp_active: bool, tw_active: bool
+    ):
+        self._update(reading)
+        self._reset_due(tznow, reading)
+        self.template_active[:] = tp_active
+        self.tw_active[:] = tw_active
+        self._update_state(reading)
+
+    def _update(self, reading: float):
+        measuring = self.state == MEASURING
+        measured = self.start_measured + (reading - self.session_start)
+        self.dirty |= measuring & (measured != self.measured)
+        np.copyto(self.measured, measured, where=measuring)
+
+    def _reset_due(self, tznow: datetime, reading: float):
+        for index in np.flatnonzero(self.next_reset <= tznow.timestamp()):
+            meter = self.meters[index]
+            meter._period.update(tznow, meter._reset, reading)
+            self.next_reset[index] = meter._period.end_timestamp
+
+    def _update_state(self, reading: float):
+        new_state = np.where(
+            self.tw_active,
+            np.where(self.template_active, MEASURING, WAITING_FOR_CONDITION),
+            WAITING_FOR_TIME_WINDOW,
+        )
+        changed = new_state != self.state
+        starting = changed & (new_state == MEASURING)
+        self.session_start[starting] = reading
+        self.start_measured[starting] = self.measured[starting]
+        np.copyto(self.state, new_state, where=changed, casting="unsafe")
+        self.dirty |= changed
+
+
+class BatchMeter(Meter):
+    """A meter of which the state is kept by a MeterBatch.
+
+    It behaves like a Meter, but it's updated through its batch.
+    """
+
+    __slots__ = ("_batch", "index")
+
+    def __init__(self, name: str, period: Period, batch: MeterBatch, index: int):
+        self._batch = batch
+        self.index = index
+        super().__init__(name, period)
+        batch.next_reset[index] = period.end_timestamp
+
+    @property
+    def state(self) -> MeterState | None:
+        return STATES[self._batch.state[self.index]]
+
+    @state.setter
+    def state(self, value: MeterState | None):
+        self._batch.state[self.index] = STATES.index(value)
+
+    @property
+    def measured_value(self) -> float:
+        return float(self._batch.measured[self.index])
+
+    @measured_value.setter
+    def measured_value(self, value: float):
+        self._batch.measured[self.index] = value
+
+    @property
+    def prev_measured_value(self) -> float:
+        return float(self._batch.prev_measured[self.index])
+
+    @prev_measured_value.setter
+    def prev_measured_value(self, value: float):
+        self._batch.prev_measured[self.index] = value
+
+    @property
+    def _session_start_reading(self) -> float | None:
+        return _optional(self._batch.session_start[self.index])
+
+    @_session_start_reading.setter
+    def _session_start_reading(self, value: float | None):
+        self._batch.session_start[self.index] = np.nan if value is None else value
+
+    @property
+    def _start_measured_value(self) -> float | None:
+        return _optional(self._batch.start_measured[self.index])
+
+    @_start_measured_value.setter
+    def _start_measured_value(self, value: float | None):
+        self._batch.start_measured[self.index] = np.nan if value is None else value
+
+    @property
+    def _template_active(self) -> bool:
+        return bool(self._batch.template_active[self.index])
+
+    @_template_active.setter
+    def _template_active(self, value: bool):
+        self._batch.template_active[self.index] = value
+
+    @property
+    def _time_window_active(self) -> bool:
+        return bool(self._batch.tw_active[self.index])
+
+    @_time_window_active.setter
+    def _time_window_active(self, value: bool):
+        self._batch.tw_active[self.index] = value
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._batch.dirty[self.index])
+
+    @dirty.setter
+    def dirty(self, value: bool):
+        self._batch.dirty[self.index] = value
+
+
+def _optional(value) -> float | None:
+    return None if math.isnan(value) else float(value)
@@ -0,0 +1,115 @@
+"""Domain-wide tracking of condition templates shared by all FlexMeasure coordinators."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+from typing import Callable
+
+from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import Event
+from homeassistant.core import HassJob
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_track_template_result
+from homeassistant.helpers.event import TrackTemplate
+from homeassistant.helpers.template import Template
+
+from .const import CONDITIONS
+from .const import DOMAIN_DATA
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+# called with the event that changed the result, if any, and the result, which is a
+# TemplateError when rendering failed
+ConditionAction = Callable[[Event | None, Any], Any]
+
+
+@callback
+def async_get_conditions(hass: HomeAssistant) -> ConditionRegistry:
+    """Return the registry shared by all config entries, create it when needed."""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    if CONDITIONS not in domain_data:
+        domain_data[CONDITIONS] = ConditionRegistry(hass)
+    return domain_data[CONDITIONS]
+
+
+class ConditionRegistry:
+    """Track every distinct condition template once, whatever the number of entries.
+
+    Conditions are identified by their template source, so entries with the same
+    condition share a single template listener. Its result is rendered once per
+    change and passed on to all subscribers. The listener is removed when the
+    last subscriber unsubscribes.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass: HomeAssistant = hass
+        self._conditions: dict[str, _SharedCondition] = {}
+
+    @property
+    def templates(self) -> int:
+        return len(self._conditions)
+
+    @callback
+    def async_subscribe(
+        self, template: Template, action: ConditionAction
+    ) -> CALLBACK_TYPE:
+        """Call action with the current result and every time the result changes."""
+        condition = self._conditions.get(template.template)
+        if condition is None:
+            condition = self._conditions[template.template] = _SharedCondition(
+                self._hass, template
+            )
+        job = HassJob(action)
+        condition.subscribers.add(job)
+        if condition.listener is None:
+            condition.async_start()
+        elif condition.rendered:
+            # the result doesn't change for a new subscriber, so it gets the last one
+            self._hass.async_run_hass_job(job, None, condition.result)
+
+        @callback
+        def unsubscribe() -> None:
+            condition.subscribers.discard(job)
+            if not condition.subscribers:
+                condition.async_stop()
+                if self._conditions.get(template.template) is condition:
+                    del self._conditions[template.template]
+
+        return unsubscribe
+
+
+class _SharedCondition:
+    __slots__ = ("_hass", "template", "subscribers", "listener", "rendered", "result")
+
+    def __init__(self, hass: HomeAssistant, template: Template) -> None:
+        self._hass: HomeAssistant = hass
+        self.template: Template = template
+        self.subscribers: set[HassJob] = set()
+        self.listener = None
+        self.rendered: bool = False
+        self.result: Any = None
+
+    @callback
+    def async_start(self) -> None:
+        _LOGGER.debug("Start tracking condition %s", self.template.template)
+        self.listener = async_track_template_result(
+            self._hass,
+            [TrackTemplate(self.template, None)],
+            self._async_on_update,
+        )
+        self.listener.async_refresh()
+
+    @callback
+    def async_stop(self) -> None:
+        _LOGGER.debug("Stop tracking condition %s", self.template.template)
+        if self.listener:
+            self.listener.async_remove()
+            self.listener = None
+
+    @callback
+    def _async_on_update(self, event: Event | None, updates) -> None:
+        self.rendered = True
+        self.result = updates[-1].result
+        for job in list(self.subscribers):
+            self._hass.async_run_hass_job(job, event, self.result)
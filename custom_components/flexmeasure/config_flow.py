@@ -9,23 +9,42 @@ from homeassistant import config_entries
 from homeassistant.const import CONF_NAME
 from homeassistant.const import CONF_UNIT_OF_MEASUREMENT
 from homeassistant.const import CONF_VALUE_TEMPLATE
+from homeassistant.core import callback
 from homeassistant.helpers import selector
 from homeassistant.helpers.template import Template
 from homeassistant.helpers.template import TemplateError
 
+from .const import CONF_BATCH
 from .const import CONF_CONDITION
 from .const import CONF_CRON
+from .const import CONF_FORCE_REFRESH_INTERVAL
+from .const import CONF_JOURNAL
+from .const import CONF_LAZY
 from .const import CONF_METER_TYPE
+from .const import CONF_MIN_INTERVAL
 from .const import CONF_PERIODS
+from .const import CONF_REFRESH_INTERVAL
+from .const import CONF_SAVE_INTERVAL
 from .const import CONF_SENSORS
+from .const import CONF_SHARED_STORE
 from .const import CONF_SOURCE
+from .const import CONF_SOURCES
+from .const import CONF_STATE_RESOLUTION
+from .const import CONF_TIME_WINDOWS
+from .const import CONF_TRACK_SOURCE
 from .const import CONF_TW_DAYS
 from .const import CONF_TW_FROM
 from .const import CONF_TW_TILL
+from .const import DEFAULT_FORCE_REFRESH_INTERVAL
+from .const import DEFAULT_MIN_INTERVAL
+from .const import DEFAULT_REFRESH_INTERVAL
+from .const import DEFAULT_SAVE_INTERVAL
+from .const import DEFAULT_STATE_RESOLUTION
 from .const import DOMAIN
 from .const import METER_TYPE_SOURCE
 from .const import METER_TYPE_TIME
 from .const import PREDEFINED_PERIODS
+from .util import invalid_sources
 
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
@@ -54,6 +73,12 @@ DAY_OPTIONS = [
 ]
 DEFAULT_DAYS = ["0", "1", "2", "3", "4", "5", "6"]
 
+SECONDS = selector.NumberSelector(
+    selector.NumberSelectorConfig(
+        min=0, step=1, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX
+    )
+)
+
 
 class FlexMeasureConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self) -> None:
@@ -62,6 +87,13 @@ class FlexMeasureConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._data = {}
         self._data[CONF_SENSORS] = []
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> FlexMeasureOptionsFlow:
+        return FlexMeasureOptionsFlow(config_entry)
+
     def is_valid_cron(self, value: str) -> bool:
         return croniter.is_valid(value)
 
@@ -233,3 +265,157 @@ class FlexMeasureConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         return self.async_create_entry(
             title=self._data[CONF_NAME], data={}, options=self._data
         )
+
+
+class FlexMeasureOptionsFlow(config_entries.OptionsFlow):
+    """Change the settings, sources and additional time windows of an entry."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        self.config_entry = config_entry
+        self._options = dict(config_entry.options)
+
+    async def async_step_init(self, user_input=None):
+        menu_options = ["settings"]
+        if self._options[CONF_METER_TYPE] == METER_TYPE_SOURCE:
+            menu_options.append("sources")
+        menu_options.append("time_window")
+        if self._options.get(CONF_TIME_WINDOWS):
+            menu_options.append("clear_time_windows")
+        menu_options.append("done")
+        return self.async_show_menu(step_id="init", menu_options=menu_options)
+
+    async def async_step_settings(self, user_input=None):
+        if user_input is not None:
+            _LOGGER.debug("Settings: %s", user_input)
+            # seconds are whole numbers, the selector returns floats
+            self._options.update(
+                {
+                    key: int(value) if isinstance(value, float) else value
+                    for key, value in user_input.items()
+                }
+            )
+            return await self.async_step_init()
+
+        options = self._options
+        if options[CONF_METER_TYPE] == METER_TYPE_SOURCE:
+            fields = {
+                vol.Optional(
+                    CONF_TRACK_SOURCE, default=options.get(CONF_TRACK_SOURCE, False)
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_MIN_INTERVAL,
+                    default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+                ): SECONDS,
+            }
+        else:
+            fields = {
+                vol.Optional(
+                    CONF_LAZY, default=options.get(CONF_LAZY, False)
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_REFRESH_INTERVAL,
+                    default=options.get(
+                        CONF_REFRESH_INTERVAL, DEFAULT_REFRESH_INTERVAL
+                    ),
+                ): SECONDS,
+            }
+        schema = vol.Schema(
+            {
+                **fields,
+                vol.Optional(
+                    CONF_SAVE_INTERVAL,
+                    default=options.get(CONF_SAVE_INTERVAL, DEFAULT_SAVE_INTERVAL),
+                ): SECONDS,
+                vol.Optional(
+                    CONF_FORCE_REFRESH_INTERVAL,
+                    default=options.get(
+                        CONF_FORCE_REFRESH_INTERVAL, DEFAULT_FORCE_REFRESH_INTERVAL
+                    ),
+                ): SECONDS,
+                vol.Optional(
+                    CONF_STATE_RESOLUTION,
+                    default=options.get(
+                        CONF_STATE_RESOLUTION, DEFAULT_STATE_RESOLUTION
+                    ),
+                ): SECONDS,
+                vol.Optional(
+                    CONF_BATCH, default=options.get(CONF_BATCH, False)
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_SHARED_STORE, default=options.get(CONF_SHARED_STORE, False)
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_JOURNAL, default=options.get(CONF_JOURNAL, False)
+                ): selector.BooleanSelector(),
+            }
+        )
+        return self.async_show_form(step_id="settings", data_schema=schema)
+
+    async def async_step_sources(self, user_input=None):
+        errors = {}
+        if user_input is not None:
+            sources = user_input.get(CONF_SOURCES)
+            if invalid_sources(sources or []):
+                # the sensors of a source are named after its object id
+                errors[CONF_SOURCES] = "duplicate_object_id"
+
+            if not errors:
+                if sources:
+                    self._options[CONF_SOURCES] = sources
+                else:
+                    # only the source entity is measured
+                    self._options.pop(CONF_SOURCES, None)
+                return await self.async_step_init()
+
+        schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_SOURCES, default=self._options.get(CONF_SOURCES, [])
+                ): selector.EntitySelector(
+                    selector.EntitySelectorConfig(multiple=True)
+                ),
+            }
+        )
+        return self.async_show_form(
+            step_id="sources", data_schema=schema, errors=errors
+        )
+
+    async def async_step_time_window(self, user_input=None):
+        errors = {}
+        if user_input is not None:
+            if not len(user_input.get(CONF_TW_DAYS)) > 0:
+                errors[CONF_TW_DAYS] = "at_least_one_day"
+
+            if not errors:
+                self._options[CONF_TIME_WINDOWS] = [
+                    *self._options.get(CONF_TIME_WINDOWS, []),
+                    user_input,
+                ]
+                return await self.async_step_init()
+
+        schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_TW_DAYS, default=DEFAULT_DAYS
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=DAY_OPTIONS,
+                        multiple=True,
+                        mode=selector.SelectSelectorMode.LIST,
+                    ),
+                ),
+                vol.Required(CONF_TW_FROM): selector.TimeSelector(),
+                vol.Required(CONF_TW_TILL): selector.TimeSelector(),
+            }
+        )
+        return self.async_show_form(
+            step_id="time_window", data_schema=schema, errors=errors
+        )
+
+    async def async_step_clear_time_windows(self, user_input=None):
+        self._options.pop(CONF_TIME_WINDOWS, None)
+        return await self.async_step_init()
+
+    async def async_step_done(self, user_input=None):
+        _LOGGER.debug("Changed options: %s", self._options)
+        return self.async_create_entry(title="", data=self._options)
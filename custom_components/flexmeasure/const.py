@@ -8,6 +8,14 @@ ATTRIBUTION = "Data provided by http://jsonplaceholder.typicode.com/"
 ISSUE_URL = "https://github.com/custom-components/ha-flexmeasure/issues"
 COORDINATOR = "coordinator"
 STORE = "store"
+SCHEDULER = "scheduler"
+CONDITIONS = "conditions"
+DOMAIN_STORE = "domain_store"
+PRELOADS = "preloads"
+SENSORS = "sensors"
+ADD_ENTITIES = "add_entities"
+OPTIONS = "options"
+SOURCES = "sources"
 
 
 # Icons
@@ -30,6 +38,7 @@ SERVICE_STOP = "stop"
 CONF_ENABLED = "enabled"
 CONF_METER_TYPE = "meter_type"
 CONF_SOURCE = "source_entity"
+CONF_SOURCES = "source_entities"  # measure several sources, instead of source_entity
 CONF_CONDITION = "condition"
 CONF_TARGET = "target_sensor"
 CONF_METERS = "meters"
@@ -41,6 +50,20 @@ CONF_STATE_CLASS = "state_class"
 CONF_TW_DAYS = "when_days"
 CONF_TW_FROM = "when_from"
 CONF_TW_TILL = "when_till"
+CONF_TIME_WINDOWS = "time_windows"  # additional windows, each with days, from and till
+CONF_SAVE_INTERVAL = "save_interval"
+CONF_TRACK_SOURCE = "track_source"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_LAZY = "lazy"
+CONF_REFRESH_INTERVAL = "refresh_interval"
+CONF_FORCE_REFRESH_INTERVAL = "force_refresh_interval"
+# a domain setting, the recorder excludes attributes for the whole integration
+CONF_REDUCE_RECORDING = "reduce_recording"
+# the state itself is written less often, so it lags up to the resolution behind
+CONF_STATE_RESOLUTION = "state_resolution"
+CONF_SHARED_STORE = "shared_store"  # keep the state in the file shared by all entries
+CONF_JOURNAL = "journal"  # append changed meters to a journal instead of saving all
+CONF_BATCH = "batch"  # update all meters of an entry at once, requires numpy
 
 METER_TYPE_TIME = "time"
 METER_TYPE_SOURCE = "source"
@@ -60,14 +83,34 @@ PREDEFINED_PERIODS = {
 }
 
 
+# Options that are applied to a running entry, a change of any other reloads it
+RECONFIGURABLE_OPTIONS = {
+    CONF_SENSORS,
+    CONF_CONDITION,
+    CONF_TW_DAYS,
+    CONF_TW_FROM,
+    CONF_TW_TILL,
+    CONF_TIME_WINDOWS,
+}
+TIME_WINDOW_OPTIONS = {CONF_TW_DAYS, CONF_TW_FROM, CONF_TW_TILL, CONF_TIME_WINDOWS}
+
+
 # Defaults
 DEFAULT_NAME = DOMAIN
+DEFAULT_SAVE_INTERVAL = 60  # seconds, 0 saves on every update
+DEFAULT_MIN_INTERVAL = 0  # seconds between updates triggered by the source
+DEFAULT_REFRESH_INTERVAL = 60  # seconds, 0 only updates lazy meters on changes
+DEFAULT_FORCE_REFRESH_INTERVAL = 3600  # seconds between writes of unchanged sensors
+DEFAULT_STATE_RESOLUTION = 0  # seconds between writes of a changed value only
 
 # Attributes
 ATTR_PREV = "prev_period"
 ATTR_NEXT_RESET = "next_reset"
 ATTR_STATUS = "status"
 
+# Slow changing attributes that are not recorded when recording is reduced
+UNRECORDED_ATTRIBUTES = {ATTR_NEXT_RESET, ATTR_PREV, ATTR_STATUS}
+
 
 STARTUP_MESSAGE = f"""
 -------------------------------------------------------------------
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import logging
+from collections import deque
 from datetime import datetime
 from datetime import timedelta
 from typing import Any
+from typing import Awaitable
 from typing import Callable
 from typing import get_args
+from typing import Iterable
 from typing import List
 
 import homeassistant.util.dt as dt_util
@@ -13,19 +16,34 @@ from homeassistant.const import STATE_UNAVAILABLE
 from homeassistant.const import STATE_UNKNOWN
 from homeassistant.core import callback
 from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import Event
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import TemplateError
-from homeassistant.helpers.event import async_track_point_in_utc_time
-from homeassistant.helpers.event import async_track_template_result
-from homeassistant.helpers.event import TrackTemplate
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.storage import Store
 from homeassistant.helpers.template import Template
 
+from .batch import MeterBatch
+from .condition import async_get_conditions
+from .const import DEFAULT_MIN_INTERVAL
+from .const import DEFAULT_REFRESH_INTERVAL
+from .const import DEFAULT_SAVE_INTERVAL
 from .meter import Meter
+from .meter import MeterState
+from .scheduler import async_get_scheduler
+from .source import SourceStatus
 from .time_window import TimeWindow
 from .util import NumberType
 
 UPDATE_INTERVAL = timedelta(minutes=1)
+
+# returns a reading, or the readings of all sources by source when the entry
+# measures several
+ValueCallback = Callable[
+    [], NumberType | SourceStatus | dict[str, NumberType | SourceStatus]
+]
+
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
@@ -38,23 +56,70 @@ class FlexMeasureCoordinator:
         meters: List[Meter],
         condition: Template | None,
         time_window: TimeWindow,
-        value_callback: Callable[[str], NumberType],
+        value_callback: ValueCallback,
+        *,
+        save_interval: int = DEFAULT_SAVE_INTERVAL,
+        source_entities: list[str] | None = None,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        lazy: bool = False,
+        refresh_interval: int = DEFAULT_REFRESH_INTERVAL,
+        batch: MeterBatch | None = None,
+        meter_sources: dict[str, str] | None = None,
     ) -> None:
         self._hass: HomeAssistant = hass
         self._name: str = config_name
         self._store: Store = store
         self._meters: dict[str, Meter] = meters
         self._condition: Template | None = condition
-        self._get_value: Callable[[str], NumberType] = value_callback
+        # the last result of the condition, applied to meters that are added
+        self._condition_result: Any = None
+        self._get_value: ValueCallback = value_callback
         self._listeners: dict[CALLBACK_TYPE, tuple[CALLBACK_TYPE, object | None]] = {}
         self._time_window: TimeWindow = time_window
         self._template_listener = None
         self._heartbeat_listener = None
+        # the sources that trigger an update when their state changes
+        self._source_entities: list[str] = source_entities or []
+        self._source_listener = None
+        self._source_debouncer: Debouncer | None = None
+        if source_entities and min_interval:
+            self._source_debouncer = Debouncer(
+                hass,
+                _LOGGER,
+                cooldown=min_interval,
+                immediate=True,
+                function=self._async_update_meters,
+            )
+        self._scheduler = async_get_scheduler(hass)
+        # lazy meters calculate their value when read, so a heartbeat is only
+        # needed to push the state to the sensors every refresh interval
+        self._lazy: bool = lazy
+        self._refresh_interval: int = refresh_interval
+        # when set, keeps the state of all meters and updates them in one pass
+        self._batch: MeterBatch | None = batch
+        self._tw_active: bool | None = None
         self._context = None
-        self.last_reading = None
+        self._save_interval: int = save_interval
+        self._stored_meters: dict[str, dict[str, Any]] = {}
+        self._pending: deque[
+            tuple[datetime, NumberType | dict[str, NumberType], bool | None]
+        ] = deque()
+        self._updating: bool = False
+        self._unsaved: bool = False
+        self._save_scheduled: bool = False
+        # when set, the entry measures several sources and every meter measures the
+        # source its name maps to, value_callback reads them all at once
+        self._meter_sources: dict[str, str] | None = meter_sources
+        self.last_reading = {} if meter_sources else None
 
-    async def async_init(self):
-        await self._async_from_storage()
+    async def async_init(self, preload: Awaitable | None = None):
+        """Restore the meters, preload is the load of the store if it's started."""
+        await self._async_from_storage(preload)
+        if self._batch:
+            self._batch.sync()
+        self._stored_meters = {
+            meter.name: Meter.to_dict(meter) for meter in self.meters
+        }
         if not self._condition:
             for meter in self.meters:
                 meter.disable_template()
@@ -62,21 +127,73 @@ class FlexMeasureCoordinator:
     async def async_stop(self):
         _LOGGER.debug("Stop listening, template listener: %s", self._template_listener)
         if self._template_listener:
-            self._template_listener.async_remove()
+            self._template_listener()
+            self._template_listener = None
         if self._heartbeat_listener:
             self._heartbeat_listener()
+            self._heartbeat_listener = None
+        if self._source_listener:
+            self._source_listener()
+            self._source_listener = None
+        if self._source_debouncer:
+            self._source_debouncer.async_cancel()
         _LOGGER.debug("Stop listeners")
+        if self._unsaved:
+            await self._async_to_storage(flush=True)
 
     async def async_start(self):
         if self._condition:
-            self._template_listener = async_track_template_result(
-                self._hass,
-                [TrackTemplate(self._condition, None)],
-                self._async_on_template_update,
+            self._async_track_condition()
+
+        if self._source_entities:
+            self._source_listener = async_track_state_change_event(
+                self._hass, self._source_entities, self._async_on_source_update
             )
-            self._template_listener.async_refresh()
 
         await self.async_on_heartbeat()
+        self._heartbeat_listener = self._scheduler.async_register(self)
+
+    @callback
+    def _async_track_condition(self) -> None:
+        # entries with the same condition share its listener
+        self._template_listener = async_get_conditions(self._hass).async_subscribe(
+            self._condition, self._async_on_template_update
+        )
+
+    @callback
+    def async_set_condition(self, condition: Template | None) -> None:
+        """Replace the condition, the meters follow the new one once it renders."""
+        if self._template_listener:
+            self._template_listener()
+            self._template_listener = None
+        self._condition = condition
+        self._condition_result = None
+        if not condition:
+            for meter in self.meters:
+                meter.disable_template()
+        elif self._heartbeat_listener:
+            self._async_track_condition()
+
+    def set_time_window(self, time_window: TimeWindow) -> None:
+        self._time_window = time_window
+
+    def add_meter(self, name: str, meter: Meter) -> None:
+        if not self._condition:
+            meter.disable_template()
+        self._meters[name] = meter
+        self._stored_meters[meter.name] = Meter.to_dict(meter)
+        self._unsaved = True
+
+    def remove_meter(self, name: str) -> Meter:
+        meter = self._meters.pop(name)
+        self._stored_meters.pop(meter.name, None)
+        self._unsaved = True
+        return meter
+
+    async def async_refresh(self) -> None:
+        """Update the meters after they or their condition or time window changed."""
+        if self._heartbeat_listener:
+            await self._async_update_meters(self._condition_result)
 
     @callback
     def async_add_listener(
@@ -92,6 +209,10 @@ class FlexMeasureCoordinator:
         update_callback()
         return remove_listener
 
+    @property
+    def name(self) -> str:
+        return self._name
+
     def get_meter(self, name: str) -> Meter:
         return self._meters[name]
 
@@ -100,6 +221,12 @@ class FlexMeasureCoordinator:
         return self._meters.values()
 
     async def _async_update_meters(self, template_result: bool | None = None):
+        """Queue an update, and process the queue unless it's already processed.
+
+        Updates that arrive while a pass awaits storage are merged into the next
+        pass. The reading is taken when an update arrives, so every condition
+        change is applied in order at the time it happened.
+        """
         tznow = dt_util.now()
         trigger = (
             f"condition changed to {template_result}"
@@ -113,50 +240,162 @@ class FlexMeasureCoordinator:
             trigger,
         )
 
+        if self._meter_sources:
+            reading = self._read_sources()
+            if not reading:
+                return  # nothing we can do... we'll try again next time
+        else:
+            try:
+                reading = self._parse_value(self._get_value())
+                self.last_reading = reading
+            except ValueError as ex:
+                _LOGGER.error(
+                    "%s # Could not update meters because the input value is invalid. Error: %s",
+                    self._name,
+                    ex,
+                )
+                # set the input value to the last updated value, so the meters are at least reset when required
+                if self.last_reading:
+                    reading = self.last_reading
+                else:
+                    return  # nothing we can do... we'll try again next time
+
+        self._pending.append((tznow, reading, template_result))
+        if self._updating:
+            return
+        self._updating = True
         try:
-            reading = self._parse_value(self._get_value())
-            self.last_reading = reading
-        except ValueError as ex:
-            _LOGGER.error(
-                "%s # Could not update meters because the input value is invalid. Error: %s",
-                self._name,
-                ex,
-            )
-            # set the input value to the last updated value, so the meters are at least reset when required
-            if self.last_reading:
-                reading = self.last_reading
+            while self._pending:
+                updates = list(self._pending)
+                self._pending.clear()
+                self._apply_updates(updates)
+
+                self._update_listeners()
+                if self._heartbeat_listener:
+                    # meters may have started or stopped measuring, which changes the wakeup
+                    self._scheduler.async_schedule(self, self.next_heartbeat())
+                await self._async_to_storage()
+        finally:
+            self._updating = False
+
+    def _apply_updates(
+        self,
+        updates: list[tuple[datetime, NumberType | dict[str, NumberType], bool | None]],
+    ) -> None:
+        for index, (tznow, reading, template_result) in enumerate(updates):
+            if template_result is None and index < len(updates) - 1:
+                # a heartbeat is covered by any later update
+                continue
+            tw_active = self._tw_active = self._time_window.is_active(tznow)
+            if self._batch:
+                if template_result is not None:
+                    self._batch.on_template_change(
+                        tznow, reading, template_result, tw_active
+                    )
+                else:
+                    self._batch.on_heartbeat(tznow, reading, tw_active)
+            elif template_result is not None:
+                for meter, meter_reading in self._meter_readings(reading):
+                    meter.on_template_change(
+                        tznow, meter_reading, template_result, tw_active
+                    )
             else:
-                return  # nothing we can do... we'll try again next time
+                for meter, meter_reading in self._meter_readings(reading):
+                    meter.on_heartbeat(tznow, meter_reading, tw_active)
 
-        tw_active = self._time_window.is_active(tznow)
-        if template_result is not None:
-            for meter in self.meters:
-                meter.on_template_change(tznow, reading, template_result, tw_active)
-        else:
-            for meter in self.meters:
-                meter.on_heartbeat(tznow, reading, tw_active)
+    def _meter_readings(
+        self, reading: NumberType | dict[str, NumberType]
+    ) -> Iterable[tuple[Meter, NumberType]]:
+        if not self._meter_sources:
+            return ((meter, reading) for meter in self.meters)
+        # meters of a source without a valid reading yet are left as they are
+        return (
+            (meter, reading[source])
+            for meter in self.meters
+            if (source := self._meter_sources[meter.name]) in reading
+        )
 
-        self._update_listeners()
-        await self._async_to_storage()
+    def _read_sources(self) -> dict[str, NumberType]:
+        """Read all sources in one pass, an invalid value keeps the last reading."""
+        for source, value in self._get_value().items():
+            try:
+                self.last_reading[source] = self._parse_value(value)
+            except ValueError as ex:
+                _LOGGER.error(
+                    "%s # Could not update the meters of %s because the input value is invalid. Error: %s",
+                    self._name,
+                    source,
+                    ex,
+                )
+        return dict(self.last_reading)
 
-    @callback
     async def async_on_heartbeat(self, now: datetime | None = None):
+        if self._lazy and not self._boundary_due(dt_util.now()):
+            # a display refresh, the meters themselves are up to date
+            self._update_listeners()
+            return
         await self._async_update_meters()
 
+    def _boundary_due(self, tznow: datetime) -> bool:
+        if self._time_window.is_active(tznow) != self._tw_active:
+            return True
+        timestamp = tznow.timestamp()
+        return any(meter.next_reset_timestamp <= timestamp for meter in self.meters)
+
+    async def _async_on_source_update(self, event: Event) -> None:
+        if event.data.get("new_state") is None:
+            return  # source entity was removed
+        if self._source_debouncer:
+            await self._source_debouncer.async_call()
+        else:
+            await self._async_update_meters()
+
+    def next_heartbeat(self) -> datetime:
+        """Return when the meters need to be updated next.
+
+        That is the earliest period reset or time window edge, or the next minute
+        when a meter is measuring a value that isn't pushed by the source. Lazy
+        meters are refreshed every refresh interval, if any, while measuring.
+        """
+        tznow = dt_util.now()
         # We _floor_ utcnow to create a schedule on a rounded minute,
         # minimizing the time between the point and the real activation.
         # That way we obtain a constant update frequency,
-        # as long as the update process takes less than a minute
-        self._heartbeat_listener = async_track_point_in_utc_time(
-            self._hass,
-            self.async_on_heartbeat,
-            dt_util.utcnow().replace(second=0, microsecond=0) + UPDATE_INTERVAL,
+        # as long as the update process takes less than a minute.
+        # It also makes all coordinators due at the same time, so the
+        # scheduler can run them in a single batch.
+        next_minute = (
+            dt_util.utcnow().replace(second=0, microsecond=0) + UPDATE_INTERVAL
         )
 
-    @callback
-    async def _async_on_template_update(self, event, updates):
-        result = updates.pop().result
+        if self._batch:
+            wakeups = [self._batch.next_reset_timestamp]
+            measuring = self._batch.any_measuring()
+        else:
+            wakeups = [meter.next_reset_timestamp for meter in self.meters]
+            measuring = any(
+                meter.state == MeterState.MEASURING for meter in self.meters
+            )
+        if tw_change := self._time_window.next_change(tznow):
+            wakeups.append(tw_change.timestamp())
+        if not self._source_listener and measuring:
+            if not self._lazy:
+                wakeups.append(next_minute.timestamp())
+            elif self._refresh_interval:
+                # aligned to the interval, so refreshes of all entries coincide
+                timestamp = tznow.timestamp()
+                wakeups.append(
+                    (timestamp // self._refresh_interval + 1) * self._refresh_interval
+                )
 
+        next_update = min(wakeups, default=None)
+        if next_update is None or next_update <= tznow.timestamp():
+            # overdue, e.g. because there was no valid reading yet, retry later
+            return next_minute
+        return dt_util.utc_from_timestamp(next_update)
+
+    @callback
+    async def _async_on_template_update(self, event: Event | None, result: Any):
         if isinstance(result, TemplateError):
             _LOGGER.error(
                 "%s # Encountered a template error: %s. Could not start or stop measuring!",
@@ -164,6 +403,7 @@ class FlexMeasureCoordinator:
                 result,
             )
         else:
+            self._condition_result = result
             await self._async_update_meters(result)
 
         if event:
@@ -181,28 +421,76 @@ class FlexMeasureCoordinator:
                 "%s # Error converting value %s to a number.", self._name, value
             )
             raise ValueError("Could not process value as it's unknown or unavailable.")
+        elif isinstance(value, SourceStatus):
+            raise ValueError(f"Could not process value as the source is {value.value}.")
         else:
             return float(value)
 
-    async def _async_from_storage(self):
+    async def _async_from_storage(self, preload: Awaitable | None = None):
         try:
-            stored_data = await self._store.async_load()
-            if stored_data:
-                for meter in self.meters:
-                    Meter.from_dict(stored_data[meter.name], meter)
+            stored_data = await (preload or self._store.async_load())
         except Exception as ex:
             _LOGGER.error(
                 "%s # Loading component state from disk failed with error: %s",
                 self._name,
                 ex,
             )
+            return
+        if not stored_data:
+            return
+        for meter in self.meters:
+            # meters added since the last save start from scratch
+            if not (data := stored_data.get(meter.name)):
+                continue
+            try:
+                Meter.from_dict(data, meter)
+            except Exception as ex:
+                # only this meter starts from scratch
+                _LOGGER.error(
+                    "%s # Restoring meter %s failed with error: %s",
+                    self._name,
+                    meter.name,
+                    ex,
+                )
 
-    async def _async_to_storage(self) -> None:
+    def _data_to_store(self) -> dict[str, dict[str, Any]]:
+        # called by the Store when it actually writes
+        self._unsaved = self._save_scheduled = False
+        # a shallow copy is enough, meter dicts are replaced and never mutated
+        return dict(self._stored_meters)
+
+    async def _async_to_storage(self, flush: bool = False) -> None:
+        """Persist the meters that changed since the last save.
+
+        Unless flush is set, the write is delayed by the save interval so all changes
+        within that interval are coalesced into a single write. The Store writes any
+        pending data when Home Assistant shuts down.
+        """
         try:
-            data = {}
-            for meter in self.meters:
-                data[meter.name] = Meter.to_dict(meter)
-            await self._store.async_save(data)
+            if self._batch:
+                changed = self._batch.pop_dirty()
+            else:
+                changed = {}
+                for meter in self.meters:
+                    if meter.dirty:
+                        changed[meter.name] = Meter.to_dict(meter)
+                        meter.dirty = False
+            for name, data in changed.items():
+                stored = self._stored_meters.get(name)
+                if stored and stored["last_reset"] != data["last_reset"]:
+                    # resets are flushed immediately, so a crash can't lose a closed period
+                    flush = True
+                self._stored_meters[name] = data
+                self._unsaved = True
+
+            if not self._unsaved:
+                return
+            if flush or not self._save_interval:
+                await self._store.async_save(self._data_to_store())
+            elif not self._save_scheduled:
+                # don't postpone an already scheduled write
+                self._save_scheduled = True
+                self._store.async_delay_save(self._data_to_store, self._save_interval)
         except Exception as ex:
             _LOGGER.error(
                 "%s # Saving component state to disk failed with error: %s",
@@ -0,0 +1,243 @@
+"""Period boundaries of cron patterns.
+
+The predefined patterns are calculated arithmetically on the local wall clock,
+croniter is only used for custom patterns. A calendar boundary that falls in a
+DST gap starts at the end of the gap, and one that occurs twice starts at its
+first occurrence.
+
+Boundaries are cached process wide by pattern and timezone, so meters sharing a
+pattern compute every boundary only once.
+"""
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+from datetime import tzinfo
+
+from croniter import croniter
+
+from .const import PREDEFINED_PERIODS
+
+CACHE_SIZE = 256
+
+# fixed length periods are aligned on the local wall clock, in seconds
+_FIXED_LENGTHS = {
+    PREDEFINED_PERIODS["5m"]: 300,
+    PREDEFINED_PERIODS["hour"]: 3600,
+}
+_CALENDAR_PERIODS = {
+    PREDEFINED_PERIODS["day"],
+    PREDEFINED_PERIODS["week"],
+    PREDEFINED_PERIODS["month"],
+    PREDEFINED_PERIODS["year"],
+}
+
+
+class _BoundaryCache:
+    """Bounded LRU cache of the current period and the next boundaries per pattern."""
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._periods: OrderedDict[tuple, tuple[datetime, datetime]] = OrderedDict()
+        self._next: OrderedDict[tuple, datetime] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def period(self, pattern: str, tznow: datetime) -> tuple[datetime, datetime]:
+        key = (pattern, tznow.tzinfo)
+        period = self._periods.get(key)
+        # timestamps are compared, datetimes in the same zone ignore the fold
+        timestamp = tznow.timestamp()
+        if period and period[0].timestamp() < timestamp <= period[1].timestamp():
+            self.hits += 1
+            self._periods.move_to_end(key)
+            return period
+
+        self.misses += 1
+        start = _calculate_prev(pattern, tznow)
+        period = self._store(self._periods, key, (start, self.next(pattern, start)))
+        return period
+
+    def next(self, pattern: str, tznow: datetime) -> datetime:
+        key = (pattern, tznow.tzinfo, tznow.timestamp())
+        boundary = self._next.get(key)
+        if boundary:
+            self.hits += 1
+            self._next.move_to_end(key)
+            return boundary
+
+        self.misses += 1
+        return self._store(self._next, key, _calculate_next(pattern, tznow))
+
+    def clear(self) -> None:
+        self._periods.clear()
+        self._next.clear()
+        self.hits = self.misses = 0
+
+    def _store(self, cache: OrderedDict, key: tuple, value):
+        cache[key] = value
+        if len(cache) > self._size:
+            cache.popitem(last=False)
+        return value
+
+
+boundary_cache = _BoundaryCache(CACHE_SIZE)
+
+
+def get_period(pattern: str, tznow: datetime) -> tuple[datetime, datetime]:
+    """Return the start and end of the period of pattern that contains tznow."""
+    return boundary_cache.period(pattern, tznow)
+
+
+def get_prev(pattern: str, tznow: datetime) -> datetime:
+    """Return the last boundary of pattern before tznow."""
+    return boundary_cache.period(pattern, tznow)[0]
+
+
+def get_next(pattern: str, tznow: datetime) -> datetime:
+    """Return the first boundary of pattern after tznow."""
+    return boundary_cache.next(pattern, tznow)
+
+
+def count_boundaries(pattern: str, start: datetime, end: datetime) -> int:
+    """Return the number of boundaries of pattern after start, up to and including end.
+
+    Both start and end must be boundaries of pattern.
+    """
+    if end <= start:
+        return 0
+    if pattern in _FIXED_LENGTHS:
+        length = _FIXED_LENGTHS[pattern]
+        if (end.utcoffset() - start.utcoffset()).total_seconds() % length == 0:
+            return round((end.timestamp() - start.timestamp()) / length)
+    elif pattern in _CALENDAR_PERIODS:
+        return _count_wall(
+            pattern, start.replace(tzinfo=None), end.replace(tzinfo=None)
+        )
+
+    # custom pattern, or a utc offset change by a fraction of the period
+    count = 0
+    while start < end:
+        start = get_next(pattern, start)
+        count += 1
+    return count
+
+
+def _calculate_prev(pattern: str, tznow: datetime) -> datetime:
+    if pattern in _FIXED_LENGTHS:
+        boundary = _fixed_boundary(_FIXED_LENGTHS[pattern], tznow, -1)
+    elif pattern in _CALENDAR_PERIODS:
+        boundary = _calendar_boundary(pattern, tznow, -1)
+    else:
+        boundary = None
+    if boundary is None:
+        return croniter(pattern, tznow).get_prev(datetime)
+    return boundary
+
+
+def _calculate_next(pattern: str, tznow: datetime) -> datetime:
+    if pattern in _FIXED_LENGTHS:
+        boundary = _fixed_boundary(_FIXED_LENGTHS[pattern], tznow, 1)
+    elif pattern in _CALENDAR_PERIODS:
+        boundary = _calendar_boundary(pattern, tznow, 1)
+    else:
+        boundary = None
+    if boundary is None:
+        return croniter(pattern, tznow).get_next(datetime)
+    return boundary
+
+
+def is_native(pattern: str) -> bool:
+    return pattern in _FIXED_LENGTHS or pattern in _CALENDAR_PERIODS
+
+
+def _fixed_boundary(length: int, tznow: datetime, direction: int) -> datetime | None:
+    timestamp = tznow.timestamp()
+    offset = tznow.utcoffset().total_seconds()
+    boundary = math.floor((timestamp + offset) / length) * length - offset
+    if direction < 0 and boundary >= timestamp:
+        boundary -= length
+    elif direction > 0:
+        boundary += length
+
+    result = datetime.fromtimestamp(boundary, tznow.tzinfo)
+    if (result.utcoffset().total_seconds() - offset) % length:
+        # the utc offset changed by a fraction of the period in between
+        return None
+    return result
+
+
+def _calendar_boundary(pattern: str, tznow: datetime, direction: int) -> datetime:
+    tz = tznow.tzinfo
+    wall = _floor_wall(pattern, tznow.replace(tzinfo=None))
+    if direction > 0:
+        wall = _step_wall(pattern, wall, 1)
+
+    while True:
+        result = _localize_first(wall, tz)
+        if direction < 0 and result >= tznow:
+            wall = _step_wall(pattern, wall, -1)
+        elif direction > 0 and result <= tznow:
+            wall = _step_wall(pattern, wall, 1)
+        else:
+            return result
+
+
+def _floor_wall(pattern: str, wall: datetime) -> datetime:
+    midnight = wall.replace(hour=0, minute=0, second=0, microsecond=0)
+    if pattern == PREDEFINED_PERIODS["day"]:
+        return midnight
+    if pattern == PREDEFINED_PERIODS["week"]:
+        return midnight - timedelta(days=midnight.weekday())
+    if pattern == PREDEFINED_PERIODS["month"]:
+        return midnight.replace(day=1)
+    return midnight.replace(month=1, day=1)
+
+
+def _step_wall(pattern: str, wall: datetime, steps: int) -> datetime:
+    if pattern == PREDEFINED_PERIODS["day"]:
+        return wall + timedelta(days=steps)
+    if pattern == PREDEFINED_PERIODS["week"]:
+        return wall + timedelta(weeks=steps)
+    if pattern == PREDEFINED_PERIODS["month"]:
+        month = wall.year * 12 + wall.month - 1 + steps
+        return wall.replace(year=month // 12, month=month % 12 + 1)
+    return wall.replace(year=wall.year + steps)
+
+
+def _count_wall(pattern: str, start: datetime, end: datetime) -> int:
+    # a boundary in a DST gap is shifted past the gap, but stays on the same date
+    if pattern == PREDEFINED_PERIODS["day"]:
+        return (end.date() - start.date()).days
+    if pattern == PREDEFINED_PERIODS["week"]:
+        return (end.date() - start.date()).days // 7
+    if pattern == PREDEFINED_PERIODS["month"]:
+        return (end.year - start.year) * 12 + end.month - start.month
+    return end.year - start.year
+
+
+def _localize_first(wall: datetime, tz: tzinfo) -> datetime:
+    """Return the first moment the wall clock shows wall, or passes it in a DST gap."""
+    if hasattr(tz, "localize"):  # pytz
+        first, second = tz.localize(wall, is_dst=True), tz.localize(wall, is_dst=False)
+    else:
+        first, second = wall.replace(tzinfo=tz), wall.replace(tzinfo=tz, fold=1)
+    if first.utcoffset() == second.utcoffset():
+        return first
+
+    low, high = sorted((first.timestamp(), second.timestamp()))
+    earliest = datetime.fromtimestamp(low, tz)
+    if earliest.replace(tzinfo=None) == wall:
+        return earliest  # the wall time occurs twice
+
+    # the wall time is skipped, bisect the moment the clock jumps over it
+    offset = earliest.utcoffset()
+    while high - low > 1:
+        middle = (low + high) // 2
+        if datetime.fromtimestamp(middle, tz).utcoffset() == offset:
+            low = middle
+        else:
+            high = middle
+    return datetime.fromtimestamp(high, tz)
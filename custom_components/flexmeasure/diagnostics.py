@@ -0,0 +1,42 @@
+"""Diagnostics support for FlexMeasure."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN_DATA
+from .const import SENSORS
+from .const import SOURCES
+from .cron import boundary_cache
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    sensors = hass.data[DOMAIN_DATA][entry.entry_id].get(SENSORS, [])
+    tracker = hass.data[DOMAIN_DATA][entry.entry_id].get(SOURCES)
+    return {
+        "options": dict(entry.options),
+        "sensors": {
+            sensor.name: {
+                "writes": sensor.writes,
+                "skipped_writes": sensor.skipped_writes,
+            }
+            for sensor in sensors
+        },
+        "sources": {
+            source.entity_id: {
+                "status": source.status.value,
+                "value": source.value,
+                "invalid_readings": source.invalid_readings,
+            }
+            for source in (tracker.sources.values() if tracker else [])
+        },
+        "boundary_cache": {
+            "hits": boundary_cache.hits,
+            "misses": boundary_cache.misses,
+        },
+    }
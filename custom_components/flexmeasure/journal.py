@@ -0,0 +1,222 @@
+"""Meter state as a snapshot plus an append-only journal of the changes since."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any
+from typing import Callable
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import Event
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import STORAGE_DIR
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .store import FIELDS  # the order of the values in a record, after the name
+
+# the journal is compacted into a new snapshot when it grows beyond this
+MAX_JOURNAL_SIZE = 64 * 1024  # bytes
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+def journal_path(hass: HomeAssistant, entry_id: str) -> str:
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}_{entry_id}.journal")
+
+
+async def async_remove_journal(hass: HomeAssistant, entry_id: str) -> None:
+    await hass.async_add_executor_job(_remove, journal_path(hass, entry_id))
+
+
+class Journal:
+    """Save the meters that changed as one line each, instead of all meters.
+
+    The meters are loaded from the snapshot in store, with the journal replayed on
+    top. Every record holds the complete state of a meter. The changes are appended
+    before they're compacted into a snapshot, so when a compaction is interrupted
+    the last record of every meter is what's in the snapshot, and replaying the
+    journal over it doesn't take any meter back in time.
+
+    It has the interface of a Store, so it's used by the coordinator as one.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        store: Store,
+        path: str,
+        max_size: int = MAX_JOURNAL_SIZE,
+    ) -> None:
+        self._hass: HomeAssistant = hass
+        self._store: Store = store
+        self._path: str = path
+        self._max_size: int = max_size
+        self._size: int = 0
+        # the meter dicts as they're written, the coordinator replaces changed ones
+        self._written: dict[str, dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._data_func: Callable[[], dict[str, dict[str, Any]]] | None = None
+        self._unsub_delay: CALLBACK_TYPE | None = None
+        self._unsub_final_write: CALLBACK_TYPE | None = None
+        self.compactions: int = 0
+
+    async def async_load(self) -> dict[str, dict[str, Any]] | None:
+        snapshot = await self._store.async_load()
+        lines = await self._hass.async_add_executor_job(_read, self._path)
+        if snapshot is None and not lines:
+            return None
+
+        data = dict(snapshot or {})
+        for line in lines:
+            try:
+                name, *values = json.loads(line)
+            except ValueError:
+                # only the last line can be incomplete, when writing it was cut off
+                _LOGGER.warning("Skipped an incomplete record in %s", self._path)
+                # start a new journal, records can't be appended to a partial line
+                await self._async_compact(data)
+                break
+            data[name] = dict(zip(FIELDS, values))
+        else:
+            self._size = sum(len(line) + 1 for line in lines)
+        self._written = dict(data)
+        return data
+
+    async def async_save(self, data: dict[str, dict[str, Any]]) -> None:
+        self._async_cancel_delay()
+        async with self._lock:
+            changed = [
+                (name, meter)
+                for name, meter in data.items()
+                if (written := self._written.get(name)) is not meter
+                and written != meter
+            ]
+            if not changed:
+                return
+            records = "".join(
+                json.dumps(
+                    [name, *(meter[field] for field in FIELDS)],
+                    separators=(",", ":"),
+                )
+                + "\n"
+                for name, meter in changed
+            )
+            # appended before a compaction too, so the journal is never older than
+            # the snapshot
+            await self._hass.async_add_executor_job(_append, self._path, records)
+            self._size += len(records)
+            self._written.update(changed)
+            if self._size > self._max_size:
+                await self._async_compact(data)
+
+    @callback
+    def async_delay_save(
+        self, data_func: Callable[[], dict[str, dict[str, Any]]], delay: float = 0
+    ) -> None:
+        """Save the data of data_func within delay seconds, or when HA stops."""
+        self._data_func = data_func
+        if self._unsub_delay is None:
+            self._unsub_delay = async_call_later(
+                self._hass, delay, self._async_on_delay
+            )
+        if self._unsub_final_write is None:
+            self._unsub_final_write = self._hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_on_final_write
+            )
+
+    async def _async_compact(self, data: dict[str, dict[str, Any]]) -> None:
+        # the snapshot is written before the journal is emptied
+        await self._store.async_save(data)
+        await self._hass.async_add_executor_job(_truncate, self._path)
+        self._size = 0
+        self.compactions += 1
+        _LOGGER.debug("Compacted %s", self._path)
+
+    async def _async_on_delay(self, _now) -> None:
+        self._unsub_delay = None
+        await self._async_save_pending()
+
+    async def _async_on_final_write(self, _event: Event) -> None:
+        self._unsub_final_write = None
+        await self._async_save_pending()
+
+    async def _async_save_pending(self) -> None:
+        if self._data_func:
+            await self.async_save(self._data_func())
+
+    @callback
+    def _async_cancel_delay(self) -> None:
+        self._data_func = None
+        if self._unsub_delay:
+            self._unsub_delay()
+            self._unsub_delay = None
+        if self._unsub_final_write:
+            self._unsub_final_write()
+            self._unsub_final_write = None
+
+
+class JournalReplay:
+    """The store of an entry without a journal, that may have kept one before.
+
+    A journal that's left is replayed onto the snapshot in store when it's loaded,
+    the result is saved as the snapshot and the journal is removed. Everything else
+    is passed to store.
+    """
+
+    def __init__(self, hass: HomeAssistant, store: Store, path: str) -> None:
+        self._hass: HomeAssistant = hass
+        self._store: Store = store
+        self._path: str = path
+
+    async def async_load(self) -> dict[str, dict[str, Any]] | None:
+        if not await self._hass.async_add_executor_job(os.path.exists, self._path):
+            return await self._store.async_load()
+        data = await Journal(self._hass, self._store, self._path).async_load()
+        if data is not None:
+            _LOGGER.debug("Replayed the journal %s", self._path)
+            await self._store.async_save(data)
+        await self._hass.async_add_executor_job(_remove, self._path)
+        return data
+
+    async def async_save(self, data: dict[str, dict[str, Any]]) -> None:
+        await self._store.async_save(data)
+
+    @callback
+    def async_delay_save(
+        self, data_func: Callable[[], dict[str, dict[str, Any]]], delay: float = 0
+    ) -> None:
+        self._store.async_delay_save(data_func, delay)
+
+
+def _read(path: str) -> list[str]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return file.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def _append(path: str, records: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(records)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _truncate(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        os.fsync(file.fileno())
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -17,7 +17,29 @@ class MeterState(str, Enum):
     WAITING_FOR_TIME_WINDOW = "waiting for time window"
 
 
+# a state is stored as its position in this list
+STATES = [
+    None,
+    MeterState.MEASURING,
+    MeterState.WAITING_FOR_CONDITION,
+    MeterState.WAITING_FOR_TIME_WINDOW,
+]
+
+
 class Meter:
+    __slots__ = (
+        "name",
+        "_period",
+        "state",
+        "measured_value",
+        "prev_measured_value",
+        "_session_start_reading",
+        "_start_measured_value",
+        "_template_active",
+        "_time_window_active",
+        "dirty",
+    )
+
     def __init__(self, name: str, period: Period):
         self.name = name
         self._period = period
@@ -31,6 +53,9 @@ class Meter:
         self._template_active: bool = False
         self._time_window_active: bool = False
 
+        # set when the persisted state changed, cleared by the coordinator when saved
+        self.dirty: bool = False
+
     @property
     def last_reset(self):
         return self._period.last_reset
@@ -39,6 +64,10 @@ class Meter:
     def next_reset(self):
         return self._period.end
 
+    @property
+    def next_reset_timestamp(self) -> float:
+        return self._period.end_timestamp
+
     def disable_template(self):
         self._template_active = True  # bit hacky but more explicit than setting _template_active from coordinator
 
@@ -74,19 +103,34 @@ class Meter:
         if new_state == MeterState.MEASURING:
             self._start(reading)
         self.state = new_state
+        self.dirty = True
 
     def _start(self, reading):
         self._session_start_reading = reading
         self._start_measured_value = self.measured_value
+        self.dirty = True
 
     def _update(self, reading: float):
         session_value = reading - self._session_start_reading
-        self.measured_value = self._start_measured_value + session_value
-
-    def _reset(self, reading):
-        self.prev_measured_value, self.measured_value = self.measured_value, 0
+        measured_value = self._start_measured_value + session_value
+        if measured_value != self.measured_value:
+            self.measured_value = measured_value
+            self.dirty = True
+
+    def _reset(self, reading, boundaries: int = 1):
+        if boundaries > 1 and self.state != MeterState.MEASURING:
+            # the period before this one passed without an update and the meter
+            # wasn't measuring, so it measured nothing
+            self.prev_measured_value = 0
+        else:
+            # when measuring across several boundaries, the value read since the
+            # last update can't be split over the missed periods, so it's kept
+            # with the closed period
+            self.prev_measured_value = self.measured_value
+        self.measured_value = 0
         self._session_start_reading = reading
         self._start_measured_value = self.measured_value
+        self.dirty = True
 
     @classmethod
     def to_dict(cls, meter: Meter) -> dict[str, str]:
@@ -95,7 +139,7 @@ class Meter:
             "start_measured_value": meter._start_measured_value,
             "prev_measured_value": meter.prev_measured_value,
             "session_start_reading": meter._session_start_reading,
-            "last_reset": dt_util.as_timestamp(meter._period.last_reset),
+            "last_reset": meter._period.last_reset_timestamp,
             "state": meter.state,
         }
         return data
@@ -108,7 +152,46 @@ class Meter:
         meter._session_start_reading = data["session_start_reading"]
         last_reset = data.get("last_reset")
         if last_reset:
-            meter._period.last_reset = dt_util.utc_from_timestamp(last_reset)
-        meter.state = MeterState(data["state"])
+            meter._period.restore(dt_util.utc_from_timestamp(last_reset))
+        # a meter that never had a reading was saved without a state
+        meter.state = MeterState(data["state"]) if data["state"] else None
 
         return meter
+
+
+class LazyTimeMeter(Meter):
+    """Time meter that calculates its measured value when it's read.
+
+    While measuring only the session start is kept, so the meter doesn't need a
+    periodic update to keep its measured value current.
+    """
+
+    __slots__ = ("_measured_value",)
+
+    def __init__(self, name: str, period: Period):
+        self._measured_value = 0
+        super().__init__(name, period)
+
+    @property
+    def measured_value(self) -> float:
+        if (
+            self.state == MeterState.MEASURING
+            and self._session_start_reading is not None
+        ):
+            return (
+                self._start_measured_value
+                + dt_util.utcnow().timestamp()
+                - self._session_start_reading
+            )
+        return self._measured_value
+
+    @measured_value.setter
+    def measured_value(self, value: float):
+        self._measured_value = value
+
+    def _update(self, reading: float):
+        # only needed to freeze the value when measuring stops, the session start
+        # that is persisted didn't change
+        self._measured_value = (
+            self._start_measured_value + reading - self._session_start_reading
+        )
@@ -1,24 +1,91 @@
 from __future__ import annotations
 
 from datetime import datetime
+from datetime import tzinfo
 from typing import Callable
 
-from croniter import croniter
+from .cron import count_boundaries
+from .cron import get_next
+from .cron import get_period
 
 
 class Period:
+    # boundaries are kept as timestamps, datetimes are only created when read
+    __slots__ = ("_start_pattern", "_tz", "_start", "_end", "_last_reset")
+
     def __init__(self, start_pattern: str, tznow: datetime) -> None:
         self._start_pattern: str = start_pattern
-        self.start: datetime = croniter(self._start_pattern, tznow).get_prev(datetime)
-        self.end = self._determine_end()
-        self.last_reset: datetime = tznow
-
-    def update(self, tznow: datetime, reset_func: Callable, input_value: float):
-        if self.end <= tznow:
-            self.last_reset = tznow
-            self.start = self.end
-            self.end = self._determine_end()
-            reset_func(input_value)
-
-    def _determine_end(self) -> datetime:
-        return croniter(self._start_pattern, self.start).get_next(datetime)
+        self._tz: tzinfo = tznow.tzinfo
+        # the boundaries are computed on first use, a restored period never needs
+        # the ones around tznow
+        self._start: float | None = None
+        self._end: float | None = None
+        self._last_reset: float = tznow.timestamp()
+
+    @property
+    def start(self) -> datetime:
+        return datetime.fromtimestamp(self.start_timestamp, self._tz)
+
+    @property
+    def end(self) -> datetime:
+        return datetime.fromtimestamp(self.end_timestamp, self._tz)
+
+    @property
+    def start_timestamp(self) -> float:
+        if self._start is None:
+            self._resolve()
+        return self._start
+
+    @property
+    def end_timestamp(self) -> float:
+        if self._end is None:
+            self._resolve()
+        return self._end
+
+    @property
+    def last_reset(self) -> datetime:
+        return datetime.fromtimestamp(self._last_reset, self._tz)
+
+    @property
+    def last_reset_timestamp(self) -> float:
+        return self._last_reset
+
+    def update(self, tznow: datetime, reset_func: Callable, input_value: float) -> int:
+        """Move to the period containing tznow, resetting once however far behind.
+
+        reset_func is called with input_value and the number of period boundaries
+        that were passed, more than one after downtime or a stalled event loop, so
+        it can tell whether the closed period is the one right before tznow. The
+        number is returned as well.
+        """
+        timestamp = tznow.timestamp()
+        if self.end_timestamp > timestamp:
+            return 0
+        start = self.end
+        end = get_next(self._start_pattern, start)
+        boundaries = 1
+        # timestamps are compared, datetimes in the same zone ignore the fold
+        if end.timestamp() <= timestamp:  # more than one period passed
+            start, end = self._period_at(tznow)
+            boundaries = count_boundaries(self._start_pattern, self.start, start)
+        self._last_reset = timestamp
+        self._start, self._end = start.timestamp(), end.timestamp()
+        reset_func(input_value, boundaries)
+        return boundaries
+
+    def restore(self, last_reset: datetime) -> None:
+        """Continue the period of a restored reset, it's caught up on the next update."""
+        self._last_reset = last_reset.timestamp()
+        self._start = self._end = None
+
+    def _resolve(self) -> None:
+        start, end = self._period_at(self.last_reset)
+        self._start, self._end = start.timestamp(), end.timestamp()
+
+    def _period_at(self, tznow: datetime) -> tuple[datetime, datetime]:
+        # a period starts at its boundary, while the previous boundary is strictly
+        # before tznow
+        start, end = get_period(self._start_pattern, tznow)
+        if end.timestamp() <= tznow.timestamp():
+            start, end = end, get_next(self._start_pattern, end)
+        return start, end
@@ -0,0 +1,22 @@
+"""Integration platform for recorder."""
+from __future__ import annotations
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_REDUCE_RECORDING
+from .const import DOMAIN_DATA
+from .const import UNRECORDED_ATTRIBUTES
+
+
+@callback
+def exclude_attributes(hass: HomeAssistant) -> set[str]:
+    """Exclude the slow changing attributes when the integration reduces recording.
+
+    The recorder excludes attributes for all entities of the integration and
+    determines them once when it's loaded, so it's a setting of the integration in
+    configuration.yaml, not of an entry.
+    """
+    if hass.data.get(DOMAIN_DATA, {}).get(CONF_REDUCE_RECORDING):
+        return set(UNRECORDED_ATTRIBUTES)
+    return set()
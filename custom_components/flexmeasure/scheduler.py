@@ -0,0 +1,130 @@
+"""Domain-wide heartbeat scheduler shared by all FlexMeasure coordinators."""
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_track_point_in_utc_time
+
+from .const import DOMAIN_DATA
+from .const import SCHEDULER
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> FlexMeasureScheduler:
+    """Return the scheduler shared by all config entries, create it when needed."""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    if SCHEDULER not in domain_data:
+        domain_data[SCHEDULER] = FlexMeasureScheduler(hass)
+    return domain_data[SCHEDULER]
+
+
+class FlexMeasureScheduler:
+    """Run the heartbeat of every registered coordinator from a single timer.
+
+    Every coordinator tells when it is due next, that can be the next minute or an
+    exact period or time window boundary. Coordinators that are due at the same
+    point in time are run in one batch. Every coordinator runs in its own task, so
+    a slow entry can't delay the others.
+    A coordinator is only rescheduled once its heartbeat finished, so slow updates
+    never pile up.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass: HomeAssistant = hass
+        self._registered: set[Any] = set()
+        self._due: dict[Any, datetime] = {}
+        self._queue: list[tuple[datetime, int, Any]] = []
+        self._counter = itertools.count()
+        self._timer: CALLBACK_TYPE | None = None
+        self._timer_at: datetime | None = None
+
+    @property
+    def coordinators(self) -> int:
+        return len(self._registered)
+
+    @callback
+    def async_register(self, coordinator) -> CALLBACK_TYPE:
+        """Add a coordinator, its heartbeat runs at coordinator.next_heartbeat()."""
+        self._registered.add(coordinator)
+        self._async_schedule(coordinator, coordinator.next_heartbeat())
+
+        @callback
+        def unregister() -> None:
+            self.async_unregister(coordinator)
+
+        return unregister
+
+    @callback
+    def async_unregister(self, coordinator) -> None:
+        # stale queue entries are skipped when the timer fires
+        self._registered.discard(coordinator)
+        self._due.pop(coordinator, None)
+        if not self._registered:
+            self._queue.clear()
+            self._async_cancel_timer()
+
+    @callback
+    def async_schedule(self, coordinator, when: datetime) -> None:
+        """Move the next heartbeat of a registered coordinator."""
+        if coordinator in self._registered and self._due.get(coordinator) != when:
+            self._async_schedule(coordinator, when)
+
+    @callback
+    def _async_schedule(self, coordinator, when: datetime) -> None:
+        self._due[coordinator] = when
+        heapq.heappush(self._queue, (when, next(self._counter), coordinator))
+        if self._timer_at is None or when < self._timer_at:
+            self._async_cancel_timer()
+            self._timer_at = when
+            self._timer = async_track_point_in_utc_time(
+                self._hass, self._async_on_tick, when
+            )
+
+    @callback
+    def _async_cancel_timer(self) -> None:
+        if self._timer:
+            self._timer()
+        self._timer = None
+        self._timer_at = None
+
+    @callback
+    def _async_on_tick(self, now: datetime) -> None:
+        self._timer = None
+        self._timer_at = None
+
+        batch = []
+        while self._queue and self._queue[0][0] <= now:
+            when, _, coordinator = heapq.heappop(self._queue)
+            if self._due.get(coordinator) != when:
+                continue  # unregistered or rescheduled in the meantime
+            del self._due[coordinator]
+            batch.append(coordinator)
+
+        _LOGGER.debug("Heartbeat for %s coordinator(s) at %s", len(batch), now)
+        for coordinator in batch:
+            self._hass.async_create_task(self._async_run(coordinator, now))
+
+        if self._queue and self._timer is None:
+            when = self._queue[0][0]
+            self._timer_at = when
+            self._timer = async_track_point_in_utc_time(
+                self._hass, self._async_on_tick, when
+            )
+
+    async def _async_run(self, coordinator, now: datetime) -> None:
+        try:
+            await coordinator.async_on_heartbeat(now)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("%s # Heartbeat failed", coordinator.name)
+        finally:
+            if coordinator in self._registered and coordinator not in self._due:
+                self._async_schedule(coordinator, coordinator.next_heartbeat())
@@ -2,6 +2,9 @@
 from __future__ import annotations
 
 import logging
+import time
+from typing import Any
+from typing import Iterable
 from typing import List
 
 from homeassistant.components.sensor import SensorDeviceClass
@@ -12,21 +15,31 @@ from homeassistant.const import CONF_NAME
 from homeassistant.const import CONF_UNIT_OF_MEASUREMENT
 from homeassistant.const import CONF_VALUE_TEMPLATE
 from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 
+from .const import ADD_ENTITIES
 from .const import ATTR_NEXT_RESET
 from .const import ATTR_PREV
 from .const import ATTR_STATUS
+from .const import CONF_FORCE_REFRESH_INTERVAL
 from .const import CONF_METER_TYPE
 from .const import CONF_SENSORS
+from .const import CONF_STATE_RESOLUTION
 from .const import COORDINATOR
+from .const import DEFAULT_FORCE_REFRESH_INTERVAL
+from .const import DEFAULT_STATE_RESOLUTION
 from .const import DOMAIN_DATA
 from .const import ICON
 from .const import METER_TYPE_TIME
+from .const import SENSORS
 from .coordinator import FlexMeasureCoordinator
 from .meter import Meter
 from .util import create_renderer
+from .util import source_sensors
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
@@ -37,15 +50,36 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Setup sensor platform."""
-    entry_id: str = config_entry.entry_id
+    entry_data = hass.data[DOMAIN_DATA][config_entry.entry_id]
+    # sensors are added and removed in place when the options change
+    entry_data[ADD_ENTITIES] = async_add_entities
+    entry_data[SENSORS] = []
+    async_add_sensors(
+        hass,
+        config_entry,
+        [sensor for _, sensor in source_sensors(config_entry.options)],
+    )
+
+
+@callback
+def async_add_sensors(
+    hass: HomeAssistant, config_entry: ConfigEntry, added: Iterable[dict[str, Any]]
+) -> None:
+    entry_data = hass.data[DOMAIN_DATA][config_entry.entry_id]
     meter_type: str = config_entry.options[CONF_METER_TYPE]
     target_sensor_name: str = config_entry.options[CONF_NAME]
+    force_refresh_interval: int = config_entry.options.get(
+        CONF_FORCE_REFRESH_INTERVAL, DEFAULT_FORCE_REFRESH_INTERVAL
+    )
+    state_resolution: float = config_entry.options.get(
+        CONF_STATE_RESOLUTION, DEFAULT_STATE_RESOLUTION
+    )
 
-    coordinator = hass.data[DOMAIN_DATA][entry_id][COORDINATOR]
+    coordinator = entry_data[COORDINATOR]
 
     sensors: List[FlexMeasureSensor] = []
 
-    for sensor in config_entry.options[CONF_SENSORS]:
+    for sensor in added:
         value_template_renderer = None
         if sensor.get(CONF_VALUE_TEMPLATE):
             value_template_renderer = create_renderer(
@@ -60,10 +94,33 @@ async def async_setup_entry(
                 sensor[CONF_NAME],
                 value_template_renderer,
                 sensor.get(CONF_UNIT_OF_MEASUREMENT),
+                force_refresh_interval,
+                state_resolution,
             )
         )
 
-    async_add_entities(sensors)
+    entry_data[SENSORS].extend(sensors)
+    entry_data[ADD_ENTITIES](sensors)
+
+
+async def async_remove_sensors(
+    hass: HomeAssistant, config_entry: ConfigEntry, removed: Iterable[str]
+) -> None:
+    """Remove the sensors of the meters with the removed names."""
+    entry_data = hass.data[DOMAIN_DATA][config_entry.entry_id]
+    removed = set(removed)
+    sensors: List[FlexMeasureSensor] = entry_data[SENSORS]
+    entry_data[SENSORS] = [
+        sensor for sensor in sensors if sensor.pattern_name not in removed
+    ]
+    registry = er.async_get(hass)
+    names = {sensor[CONF_NAME] for sensor in config_entry.options[CONF_SENSORS]}
+    for sensor in sensors:
+        if sensor.pattern_name in removed:
+            await sensor.async_remove()
+            if sensor.pattern_name not in names and sensor.registry_entry:
+                # deleted rather than replaced, so it isn't left as unavailable
+                registry.async_remove(sensor.entity_id)
 
 
 class FlexMeasureSensor(SensorEntity):
@@ -75,6 +132,8 @@ class FlexMeasureSensor(SensorEntity):
         pattern_name,
         value_template_renderer,
         unit_of_measurement,
+        force_refresh_interval=DEFAULT_FORCE_REFRESH_INTERVAL,
+        state_resolution=DEFAULT_STATE_RESOLUTION,
     ):
         self._meter_type = meter_type
         self._coordinator: FlexMeasureCoordinator = coordinator
@@ -91,10 +150,27 @@ class FlexMeasureSensor(SensorEntity):
         if self._meter_type == METER_TYPE_TIME:
             self._attr_device_class = SensorDeviceClass.DURATION
 
+        # what was written last, unchanged states are only written every force
+        # refresh interval
+        self._force_refresh_interval: int = force_refresh_interval
+        self._written: tuple[Any, ...] | None = None
+        self._written_at: float = 0
+        # a value change alone is written at most once per state resolution, any
+        # other change is written immediately
+        self._state_resolution: float = state_resolution
+        self._delayed_write: CALLBACK_TYPE | None = None
+        self.writes: int = 0
+        self.skipped_writes: int = 0
+
+    @property
+    def pattern_name(self) -> str:
+        return self._pattern_name
+
     async def async_added_to_hass(self):
         self.async_on_remove(
             self._coordinator.async_add_listener(self._handle_coordinator_update)
         )
+        self.async_on_remove(self._async_cancel_delayed_write)
 
     @callback
     def _handle_coordinator_update(self) -> None:
@@ -124,6 +200,52 @@ class FlexMeasureSensor(SensorEntity):
 
         self._attr_last_reset = meter.last_reset
         self._attr_extra_state_attributes[ATTR_NEXT_RESET] = meter.next_reset
-        self.async_set_context(self._coordinator._context)
+        self._async_write_if_changed()
 
+    @callback
+    def _async_write_if_changed(self) -> None:
+        snapshot = (
+            self._attr_native_value,
+            self._attr_last_reset,
+            dict(self._attr_extra_state_attributes),
+        )
+        now = time.monotonic()
+        if (
+            snapshot == self._written
+            and now - self._written_at < self._force_refresh_interval
+        ):
+            self.skipped_writes += 1
+            return
+        if (
+            self._state_resolution
+            and self._written
+            and snapshot[1:] == self._written[1:]
+            and now - self._written_at < self._state_resolution
+        ):
+            # only the value changed, the latest value is written when the
+            # resolution interval passed
+            self.skipped_writes += 1
+            if not self._delayed_write:
+                self._delayed_write = async_call_later(
+                    self.hass,
+                    self._state_resolution - (now - self._written_at),
+                    self._async_on_delayed_write,
+                )
+            return
+
+        self._async_cancel_delayed_write()
+        self._written, self._written_at = snapshot, now
+        self.writes += 1
+        self.async_set_context(self._coordinator._context)
         self.async_write_ha_state()
+
+    @callback
+    def _async_on_delayed_write(self, _now) -> None:
+        self._delayed_write = None
+        self._async_write_if_changed()
+
+    @callback
+    def _async_cancel_delayed_write(self) -> None:
+        if self._delayed_write:
+            self._delayed_write()
+            self._delayed_write = None
@@ -0,0 +1,108 @@
+"""Source entity states, parsed when they change instead of on every update."""
+from __future__ import annotations
+
+import logging
+from enum import Enum
+from typing import Iterable
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.const import STATE_UNKNOWN
+from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import Event
+from homeassistant.core import HomeAssistant
+from homeassistant.core import State
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .util import NumberType
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+class SourceStatus(str, Enum):
+    VALID = "valid"
+    MISSING = "missing"  # the entity doesn't exist, or was removed
+    UNKNOWN = STATE_UNKNOWN
+    UNAVAILABLE = STATE_UNAVAILABLE
+    INVALID = "invalid"  # the state isn't a number
+
+
+class Source:
+    __slots__ = ("entity_id", "value", "status", "reading", "invalid_readings")
+
+    def __init__(self, entity_id: str) -> None:
+        self.entity_id: str = entity_id
+        # the last valid value, kept while the source has no valid state
+        self.value: NumberType | None = None
+        self.status: SourceStatus = SourceStatus.MISSING
+        # the value, or the status when the current state isn't valid
+        self.reading: NumberType | SourceStatus = self.status
+        self.invalid_readings: int = 0
+
+    def update(self, state: State | None) -> None:
+        if state is None:
+            self.status = SourceStatus.MISSING
+        elif state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            self.status = SourceStatus(state.state)
+        else:
+            try:
+                self.value = self.reading = float(state.state)
+                self.status = SourceStatus.VALID
+                return
+            except ValueError:
+                self.status = SourceStatus.INVALID
+        self.reading = self.status
+        self.invalid_readings += 1
+        _LOGGER.debug("%s is %s", self.entity_id, self.status.value)
+
+
+class SourceTracker:
+    """Keep the parsed values of source entities, updated by their state changes.
+
+    Reading a source is a dict lookup, the state machine isn't queried and no state
+    is parsed when the meters are updated. A source that is missing, unknown,
+    unavailable or not a number reads as its status, and is counted as an invalid
+    reading every time it gets such a state.
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_ids: Iterable[str]) -> None:
+        self._hass: HomeAssistant = hass
+        self.sources: dict[str, Source] = {
+            entity_id: Source(entity_id) for entity_id in entity_ids
+        }
+        # the reading of every source, so a read is a single lookup
+        self._readings: dict[str, NumberType | SourceStatus] = {}
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Resolve the current states, and follow their changes.
+
+        Start before anything else listens to the sources, so listeners that are
+        called for the same state change read the new value.
+        """
+        for entity_id, source in self.sources.items():
+            source.update(self._hass.states.get(entity_id))
+            self._readings[entity_id] = source.reading
+        self._unsub = async_track_state_change_event(
+            self._hass, list(self.sources), self._async_on_state_change
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+
+    def reading(self, entity_id: str) -> NumberType | SourceStatus:
+        return self._readings[entity_id]
+
+    def readings(self) -> dict[str, NumberType | SourceStatus]:
+        return dict(self._readings)
+
+    @callback
+    def _async_on_state_change(self, event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        source = self.sources[entity_id]
+        source.update(event.data.get("new_state"))
+        self._readings[entity_id] = source.reading
@@ -0,0 +1,253 @@
+"""Storage of the meter state, per entry or in one file shared by all entries.
+
+Since version 2 the meters of an entry are stored as columns, a list per field in
+the order of the meter names, with a state stored as its code.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+from typing import Callable
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .const import DOMAIN_DATA
+from .const import DOMAIN_STORE
+from .meter import STATES
+
+STORAGE_VERSION = 2
+
+# the fields of Meter.to_dict, stored as columns
+FIELDS = (
+    "measured_value",
+    "start_measured_value",
+    "prev_measured_value",
+    "session_start_reading",
+    "last_reset",
+    "state",
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+def encode(meters: dict[str, dict[str, Any]]) -> dict[str, list]:
+    """Turn Meter.to_dict of every meter, by name, into columns."""
+    columns = {"name": list(meters)}
+    for field in FIELDS:
+        columns[field] = [meter[field] for meter in meters.values()]
+    columns["state"] = [STATES.index(state) for state in columns["state"]]
+    return columns
+
+
+def decode(columns: dict[str, list]) -> dict[str, dict[str, Any]]:
+    """Turn columns back into Meter.to_dict of every meter, by name."""
+    states = [STATES[code] for code in columns["state"]]
+    rows = zip(*(states if field == "state" else columns[field] for field in FIELDS))
+    return {name: dict(zip(FIELDS, row)) for name, row in zip(columns["name"], rows)}
+
+
+class _Store(Store):
+    """A Store of the current version, that converts data of version 1 by migrate."""
+
+    def __init__(
+        self, hass: HomeAssistant, key: str, migrate: Callable[[Any], Any]
+    ) -> None:
+        super().__init__(hass, STORAGE_VERSION, key)
+        self._migrate: Callable[[Any], Any] = migrate
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        if old_major_version == 1:  # a dict per meter
+            return self._migrate(old_data)
+        return await super()._async_migrate_func(
+            old_major_version, old_minor_version, old_data
+        )
+
+
+class MeterStore:
+    """The meters of an entry in a file of its own, with the interface of a Store.
+
+    The meters are loaded and saved as Meter.to_dict by name, and stored as columns.
+    """
+
+    def __init__(self, hass: HomeAssistant, key: str) -> None:
+        self._store: _Store = _Store(hass, key, encode)
+
+    @property
+    def key(self) -> str:
+        return self._store.key
+
+    async def async_load(self) -> dict[str, dict[str, Any]] | None:
+        columns = await self._store.async_load()
+        return None if columns is None else decode(columns)
+
+    async def async_save(self, data: dict[str, dict[str, Any]]) -> None:
+        await self._store.async_save(encode(data))
+
+    @callback
+    def async_delay_save(
+        self, data_func: Callable[[], dict[str, dict[str, Any]]], delay: float = 0
+    ) -> None:
+        self._store.async_delay_save(lambda: encode(data_func()), delay)
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
+
+
+class UnsharedStore(MeterStore):
+    """The file of an entry that doesn't share the file of all entries.
+
+    When the file doesn't exist, the entry may have shared the file before, so its
+    data is moved out of the shared file.
+    """
+
+    def __init__(self, hass: HomeAssistant, key: str, entry_id: str) -> None:
+        super().__init__(hass, key)
+        self._hass: HomeAssistant = hass
+        self._entry_id: str = entry_id
+
+    async def async_load(self) -> dict[str, dict[str, Any]] | None:
+        data = await super().async_load()
+        if data is None:
+            data = await async_get_domain_store(self._hass).async_move_entry(
+                self._entry_id, self
+            )
+        return data
+
+
+@callback
+def async_get_domain_store(hass: HomeAssistant) -> DomainStore:
+    """Return the store shared by all config entries, create it when needed."""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    if DOMAIN_STORE not in domain_data:
+        domain_data[DOMAIN_STORE] = DomainStore(hass)
+    return domain_data[DOMAIN_STORE]
+
+
+class DomainStore:
+    """Keep the state of every entry that opted in in a single storage file.
+
+    The file is loaded once, for all entries, by the first entry that's set up.
+    Delayed saves of all entries are written together and a delayed save is never
+    postponed by another entry. Immediate saves that arrive while the file is being
+    written are combined into the next write.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store: _Store = _Store(hass, DOMAIN, _encode_entries)
+        self._data: dict[str, Any] | None = None
+        self._load_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        # entries with a delayed save, their data is collected when the file is written
+        self._data_funcs: dict[str, Callable[[], Any]] = {}
+        self._delayed_until: float | None = None
+        self._unsaved: bool = False
+        self._loop = hass.loop
+
+    async def async_load(self) -> dict[str, Any]:
+        """Return the data of all entries, by entry id."""
+        async with self._load_lock:
+            if self._data is None:
+                stored = await self._store.async_load() or {}
+                self._data = {
+                    entry_id: decode(columns) for entry_id, columns in stored.items()
+                }
+        return self._data
+
+    async def async_load_entry(self, entry_id: str, legacy: MeterStore) -> Any:
+        """Return the data of an entry, migrated from its own file if needed.
+
+        The entry file is removed once its data has been written to the shared file.
+        """
+        data = await self.async_load()
+        if entry_id not in data:
+            legacy_data = await legacy.async_load()
+            if legacy_data is None:
+                return None
+            _LOGGER.debug("Moving %s into the shared store", legacy.key)
+            await self.async_save_entry(entry_id, legacy_data)
+            await legacy.async_remove()
+        return data.get(entry_id)
+
+    async def async_move_entry(self, entry_id: str, store: MeterStore) -> Any:
+        """Move the data of an entry that stopped sharing the file into store.
+
+        The entry is removed from the shared file once its data has been written to
+        store.
+        """
+        data = await self.async_load()
+        if data_func := self._data_funcs.pop(entry_id, None):
+            # a delayed save of the entry before it stopped sharing
+            data[entry_id] = data_func()
+        if (entry_data := data.get(entry_id)) is None:
+            return None
+        _LOGGER.debug("Moving %s out of the shared store", store.key)
+        await store.async_save(entry_data)
+        await self.async_remove_entry(entry_id)
+        return entry_data
+
+    async def async_save_entry(self, entry_id: str, data: Any) -> None:
+        """Write the data of an entry, along with the pending data of the others."""
+        (await self.async_load())[entry_id] = data
+        self._data_funcs.pop(entry_id, None)
+        await self._async_write()
+
+    @callback
+    def async_delay_save_entry(
+        self, entry_id: str, data_func: Callable[[], Any], delay: float
+    ) -> None:
+        """Write the data of an entry within delay seconds."""
+        self._data_funcs[entry_id] = data_func
+        due = self._loop.time() + delay
+        if self._delayed_until is None or due < self._delayed_until:
+            self._delayed_until = due
+            self._store.async_delay_save(self._data_to_store, delay)
+
+    async def async_remove_entry(self, entry_id: str) -> None:
+        data = await self.async_load()
+        self._data_funcs.pop(entry_id, None)
+        if data.pop(entry_id, None) is not None:
+            await self._async_write()
+
+    async def _async_write(self) -> None:
+        self._unsaved = True
+        async with self._write_lock:
+            if self._unsaved:  # or it was written while waiting for the lock
+                await self._store.async_save(self._data_to_store())
+
+    def _data_to_store(self) -> dict[str, Any]:
+        # called by the Store when it actually writes
+        for entry_id, data_func in self._data_funcs.items():
+            self._data[entry_id] = data_func()
+        self._data_funcs.clear()
+        self._delayed_until = None
+        self._unsaved = False
+        return _encode_entries(self._data)
+
+
+class EntryStore:
+    """The part of a DomainStore of one entry, with the interface of a Store."""
+
+    def __init__(
+        self, domain_store: DomainStore, entry_id: str, legacy: MeterStore
+    ) -> None:
+        self._domain_store: DomainStore = domain_store
+        self._entry_id: str = entry_id
+        self._legacy: MeterStore = legacy
+
+    async def async_load(self) -> Any:
+        return await self._domain_store.async_load_entry(self._entry_id, self._legacy)
+
+    async def async_save(self, data: Any) -> None:
+        await self._domain_store.async_save_entry(self._entry_id, data)
+
+    @callback
+    def async_delay_save(self, data_func: Callable[[], Any], delay: float = 0) -> None:
+        self._domain_store.async_delay_save_entry(self._entry_id, data_func, delay)
+
+
+def _encode_entries(data: dict[str, dict[str, dict[str, Any]]]) -> dict[str, Any]:
+    return {entry_id: encode(meters) for entry_id, meters in data.items()}
@@ -1,28 +1,116 @@
+from __future__ import annotations
+
+from bisect import bisect_right
 from datetime import datetime
+from datetime import timedelta
+from typing import Iterable
 from typing import List
+from typing import Tuple
+
+from .util import localize
+
+DAY = 86400
+WEEK = 7 * DAY
 
 
 class TimeWindow:
-    def __init__(self, days: List[str], from_time: str, till_time: str) -> None:
+    """One or more weekly windows, compiled into a sorted table of active intervals.
+
+    Intervals are in seconds since monday 00:00 on the wall clock, so looking up
+    whether a moment is within a window, or when that changes, is a bisect.
+    """
+
+    def __init__(
+        self,
+        days: List[str],
+        from_time: str,
+        till_time: str,
+        extra_windows: Iterable[Tuple[List[str], str, str]] = (),
+    ) -> None:
         self.days = [int(day) for day in days]
         self.start = datetime.strptime(from_time, "%H:%M:%S").time()
         self.end = datetime.strptime(till_time, "%H:%M:%S").time()
 
+        intervals = list(_intervals(self.days, self.start, self.end))
+        for extra_days, extra_from, extra_till in extra_windows:
+            intervals.extend(
+                _intervals(
+                    [int(day) for day in extra_days],
+                    datetime.strptime(extra_from, "%H:%M:%S").time(),
+                    datetime.strptime(extra_till, "%H:%M:%S").time(),
+                )
+            )
+        self._starts, self._ends = _merge(intervals)
+        self._edges = _edges(self._starts, self._ends)
+
     def is_active(self, tznow: datetime):
-        check_time = tznow.time()
-        if self.start < self.end:
-            if check_time >= self.start and check_time <= self.end:
-                return tznow.weekday() in self.days
-        else:  # crosses midnight
-            if check_time >= self.start or check_time <= self.end:
-                if check_time < self.start:
-                    return prev_weekday(tznow.weekday()) in self.days
-                else:
-                    return tznow.weekday() in self.days
-        return False
-
-
-def prev_weekday(day: int) -> int:
-    if day == 0:
-        return 6
-    return day - 1
+        position = _week_position(tznow)
+        index = bisect_right(self._starts, position) - 1
+        return index >= 0 and position < self._ends[index]
+
+    def next_change(self, tznow: datetime) -> datetime | None:
+        """Return the first moment after tznow at which the window opens or closes."""
+        if not self._edges:
+            return None
+        naive = tznow.replace(tzinfo=None)
+        week_start = datetime.combine(
+            naive.date() - timedelta(days=naive.weekday()), datetime.min.time()
+        )
+        position = _week_position(tznow)
+        index = bisect_right(self._edges, position)
+        # an edge can be before tznow when the clock is turned back
+        for _ in range(2 * len(self._edges) + 1):
+            week, edge_index = divmod(index, len(self._edges))
+            edge = localize(
+                week_start + timedelta(seconds=week * WEEK + self._edges[edge_index]),
+                tznow.tzinfo,
+            )
+            if edge > tznow:
+                return edge
+            index += 1
+        return None
+
+
+def _week_position(tznow: datetime) -> int:
+    return tznow.weekday() * DAY + tznow.hour * 3600 + tznow.minute * 60 + tznow.second
+
+
+def _intervals(days: List[int], start, end) -> Iterable[Tuple[int, int]]:
+    start_seconds = start.hour * 3600 + start.minute * 60 + start.second
+    end_seconds = end.hour * 3600 + end.minute * 60 + end.second
+    if start_seconds < end_seconds:
+        length = end_seconds + 1 - start_seconds  # the end time is still active
+    elif start_seconds > end_seconds:  # crosses midnight
+        length = DAY + end_seconds + 1 - start_seconds
+    else:  # a full day from the start time
+        length = DAY
+
+    for day in days:
+        interval_start = day * DAY + start_seconds
+        interval_end = interval_start + length
+        if interval_end <= WEEK:
+            yield interval_start, interval_end
+        else:  # sunday into monday
+            yield interval_start, WEEK
+            yield 0, interval_end - WEEK
+
+
+def _merge(intervals: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    starts: List[int] = []
+    ends: List[int] = []
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def _edges(starts: List[int], ends: List[int]) -> List[int]:
+    """Return the positions at which the window opens or closes, within a week."""
+    edges = set(starts) | set(ends)
+    if starts and starts[0] == 0 and ends[-1] == WEEK:
+        # continues from sunday into monday
+        edges -= {0, WEEK}
+    return sorted({edge % WEEK for edge in edges})
@@ -1,27 +1,125 @@
 import logging
+from collections import Counter
+from collections import OrderedDict
+from datetime import datetime
+from datetime import tzinfo
 from decimal import Decimal
+from typing import Any
+from typing import Iterable
+from typing import Mapping
 from typing import Union
 
+from homeassistant.const import CONF_NAME
+from homeassistant.core import split_entity_id
+from homeassistant.core import valid_entity_id
 from homeassistant.exceptions import TemplateError
+from homeassistant.helpers.template import RenderInfo
 from homeassistant.helpers.template import Template
 
+from .const import CONF_SENSORS
+from .const import CONF_SOURCES
+
 NumberType = Union[float, Decimal, int]
 
+RENDER_CACHE_SIZE = 16
+
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
+def localize(naive: datetime, tz: tzinfo) -> datetime:
+    """Attach a timezone to a naive wall clock time, for both zoneinfo and pytz."""
+    if hasattr(tz, "localize"):
+        return tz.localize(naive)
+    return naive.replace(tzinfo=tz)
+
+
+def source_sensors(
+    options: Mapping[str, Any]
+) -> list[tuple[str | None, dict[str, Any]]]:
+    """Return the sensors of an entry, with their source when it measures several.
+
+    Every source gets all sensors, named after its object id, e.g. kitchen_day for
+    the day sensor of sensor.kitchen. The sources are checked by invalid_sources.
+    """
+    sources = options.get(CONF_SOURCES)
+    if not sources:
+        return [(None, sensor) for sensor in options[CONF_SENSORS]]
+    return [
+        (
+            source,
+            {**sensor, CONF_NAME: f"{_source_key(source)}_{sensor[CONF_NAME]}"},
+        )
+        for source in sources
+        for sensor in options[CONF_SENSORS]
+    ]
+
+
+def invalid_sources(sources: Iterable[str]) -> list[str]:
+    """Return the sources that can't name their sensors.
+
+    A source configured by its entity registry id would name its sensors after the
+    id, and a source with the object id of another source would get the names, and
+    the unique ids, of the sensors of that source.
+    """
+    sources = list(sources)
+    keys = Counter(_source_key(source) for source in sources if valid_entity_id(source))
+    return [
+        source
+        for source in sources
+        if not valid_entity_id(source) or keys[_source_key(source)] > 1
+    ]
+
+
+def _source_key(source: str) -> str:
+    return split_entity_id(source)[1]
+
+
 def create_renderer(hass, value_template):
     """Create a renderer based on variable_template value."""
     if value_template is None:
         return lambda value: value
 
     value_template = Template(value_template, hass)
+    # results of a template that only depends on value are cached by value, until
+    # a render shows the template reads states or the time
+    cache: OrderedDict[NumberType, str] = OrderedDict()
+    pure = True
 
     def _render(value):
+        nonlocal pure
+        if value in cache:
+            cache.move_to_end(value)
+            return cache[value]
+
         try:
-            return value_template.async_render({"value": value}, parse_result=False)
+            if not pure:
+                return value_template.async_render({"value": value}, parse_result=False)
+            info = value_template.async_render_to_info(
+                {"value": value}, parse_result=False
+            )
+            result = info.result()
         except TemplateError:
             _LOGGER.exception("Error parsing value")
             return value
 
+        if _is_pure(info):
+            cache[value] = result
+            if len(cache) > RENDER_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            pure = False
+            cache.clear()
+        return result
+
     return _render
+
+
+def _is_pure(info: RenderInfo) -> bool:
+    return not (
+        info.entities
+        or info.domains
+        or info.domains_lifecycle
+        or info.all_states
+        or info.all_states_lifecycle
+        or info.has_time
+    )
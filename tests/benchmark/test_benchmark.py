@@ -0,0 +1,370 @@
+"""Benchmarks of FlexMeasure at scale.
+
+Every benchmark sets up N entries with M meters each. The sizes are read from
+FLEXMEASURE_BENCHMARK_SIZES as a comma separated list of NxM, by default only a
+tiny size is run as part of the test suite:
+
+    FLEXMEASURE_BENCHMARK_SIZES=1x1,10x5,100x20,500x20 \
+    FLEXMEASURE_BENCHMARK_OUTPUT=benchmark.json pytest tests/benchmark
+
+The memory of FLEXMEASURE_BENCHMARK_MEMORY_METERS meters, 10000 by default, is
+measured with tracemalloc. The size and load time of the storage formats are
+compared for N times M meters.
+
+Every result is appended as a JSON line to FLEXMEASURE_BENCHMARK_OUTPUT, so the
+results of different commits can be compared.
+"""
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from datetime import timezone
+
+import pytest
+from custom_components.flexmeasure.const import CONF_BATCH
+from custom_components.flexmeasure.const import CONF_CONDITION
+from custom_components.flexmeasure.const import CONF_CRON
+from custom_components.flexmeasure.const import CONF_SAVE_INTERVAL
+from custom_components.flexmeasure.const import CONF_SENSORS
+from custom_components.flexmeasure.const import CONF_SHARED_STORE
+from custom_components.flexmeasure.const import CONF_SOURCE
+from custom_components.flexmeasure.const import CONF_SOURCES
+from custom_components.flexmeasure.const import COORDINATOR
+from custom_components.flexmeasure.const import DOMAIN
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.const import PREDEFINED_PERIODS
+from custom_components.flexmeasure.meter import Meter
+from custom_components.flexmeasure.period import Period
+from custom_components.flexmeasure.store import decode
+from custom_components.flexmeasure.store import encode
+from custom_components.flexmeasure.store import STORAGE_VERSION
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_NAME
+from homeassistant.const import CONF_UNIT_OF_MEASUREMENT
+from homeassistant.const import CONF_VALUE_TEMPLATE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import storage
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from ..const import MOCK_SOURCE_CONFIG_FINAL
+from ..const import MOCK_TIME_CONFIG_FINAL
+
+SIZES = [
+    tuple(int(part) for part in size.split("x"))
+    for size in os.environ.get("FLEXMEASURE_BENCHMARK_SIZES", "1x1,2x3").split(",")
+]
+MEMORY_METERS = int(os.environ.get("FLEXMEASURE_BENCHMARK_MEMORY_METERS", 10000))
+ROUNDS = int(os.environ.get("FLEXMEASURE_BENCHMARK_ROUNDS", 5))
+OUTPUT = os.environ.get("FLEXMEASURE_BENCHMARK_OUTPUT")
+
+CONDITION_ENTITY = "input_boolean.benchmark"
+CONDITION = f"{{{{ is_state('{CONDITION_ENTITY}', 'on') }}}}"
+
+
+def sensors(meters: int) -> list[dict]:
+    periods = [
+        pattern for name, pattern in PREDEFINED_PERIODS.items() if name != "none"
+    ]
+    return [
+        {
+            CONF_NAME: f"meter{index}",
+            CONF_CRON: periods[index % len(periods)],
+            CONF_UNIT_OF_MEASUREMENT: None,
+            CONF_VALUE_TEMPLATE: None,
+        }
+        for index in range(meters)
+    ]
+
+
+async def setup_entries(
+    hass: HomeAssistant, entries: int, meters: int, **options
+) -> list[MockConfigEntry]:
+    config_entries = []
+    for index in range(entries):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            options={
+                **MOCK_TIME_CONFIG_FINAL,
+                CONF_NAME: f"benchmark{index}",
+                CONF_SENSORS: sensors(meters),
+                **options,
+            },
+            entry_id=f"benchmark{index}",
+        )
+        entry.add_to_hass(hass)
+        config_entries.append(entry)
+
+    # sets up all entries of the domain
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    assert all(entry.state is ConfigEntryState.LOADED for entry in config_entries)
+    return config_entries
+
+
+async def unload_entries(hass: HomeAssistant, entries: list[MockConfigEntry]):
+    for entry in entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+def coordinators(hass: HomeAssistant, entries: list[MockConfigEntry]):
+    return [hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR] for entry in entries]
+
+
+def report(benchmark: str, size: tuple[int, int], samples: list[float], **extra):
+    """Print the result and append it to the output file, if any."""
+    entries, meters = size
+    result = {
+        "benchmark": benchmark,
+        "entries": entries,
+        "meters": meters,
+        "rounds": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        **extra,
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    print(json.dumps(result))
+    if OUTPUT:
+        with open(OUTPUT, "a", encoding="utf-8") as file:
+            file.write(json.dumps(result) + "\n")
+    return result
+
+
+def stored_state(entries: int, meters: int, shared: bool) -> dict:
+    """Return the storage of entries that measured before, as in hass_storage."""
+    tznow = dt_util.now()
+    data = {}
+    for index in range(entries):
+        state = {}
+        for sensor in sensors(meters):
+            name = f"benchmark{index}_{sensor[CONF_NAME]}"
+            meter = Meter(name, Period(sensor[CONF_CRON], tznow))
+            meter.disable_template()
+            meter.on_heartbeat(tznow, tznow.timestamp(), True)
+            state[name] = Meter.to_dict(meter)
+        data[f"benchmark{index}"] = encode(state)
+
+    if shared:
+        return {DOMAIN: {"version": STORAGE_VERSION, "key": DOMAIN, "data": data}}
+    return {
+        f"{DOMAIN}_{entry_id}": {
+            "version": STORAGE_VERSION,
+            "key": f"{DOMAIN}_{entry_id}",
+            "data": columns,
+        }
+        for entry_id, columns in data.items()
+    }
+
+
+@pytest.mark.parametrize("restored", [False, True], ids=["new", "restored"])
+@pytest.mark.parametrize("shared", [False, True], ids=["entry_files", "shared"])
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: "x".join(map(str, size)))
+async def test_startup(hass: HomeAssistant, hass_storage, size, shared, restored):
+    if restored:
+        hass_storage.update(stored_state(*size, shared))
+
+    start = time.perf_counter()
+    entries = await setup_entries(hass, *size, **{CONF_SHARED_STORE: shared})
+    elapsed = time.perf_counter() - start
+
+    report("startup", size, [elapsed], shared=shared, restored=restored)
+    await unload_entries(hass, entries)
+
+
+@pytest.mark.parametrize("batch", [False, True], ids=["meters", "batch"])
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: "x".join(map(str, size)))
+async def test_heartbeat(hass: HomeAssistant, hass_storage, size, batch):
+    entries = await setup_entries(hass, *size, **{CONF_BATCH: batch})
+
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for coordinator in coordinators(hass, entries):
+            await coordinator.async_on_heartbeat()
+        samples.append(time.perf_counter() - start)
+
+    report("heartbeat", size, samples, batch=batch)
+    await unload_entries(hass, entries)
+
+
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: "x".join(map(str, size)))
+async def test_condition_fan_out(hass: HomeAssistant, hass_storage, size):
+    hass.states.async_set(CONDITION_ENTITY, "off")
+    entries = await setup_entries(hass, *size, **{CONF_CONDITION: CONDITION})
+
+    samples = []
+    for index in range(ROUNDS * 2):
+        start = time.perf_counter()
+        hass.states.async_set(CONDITION_ENTITY, "on" if index % 2 == 0 else "off")
+        await hass.async_block_till_done()
+        samples.append(time.perf_counter() - start)
+
+    report("condition_fan_out", size, samples)
+    await unload_entries(hass, entries)
+
+
+@pytest.mark.parametrize("multi", [False, True], ids=["entries", "sources"])
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: "x".join(map(str, size)))
+async def test_sources(hass: HomeAssistant, hass_storage, size, multi):
+    """Measure N sources with an entry each, or with a single entry."""
+    sources, meters = size
+    source_entities = [f"sensor.source{index}" for index in range(sources)]
+    for entity_id in source_entities:
+        hass.states.async_set(entity_id, "0")
+    options = {
+        **MOCK_SOURCE_CONFIG_FINAL,
+        CONF_CONDITION: CONDITION,
+        CONF_SENSORS: sensors(meters),
+    }
+    if multi:
+        size = (1, sources * meters)
+        config = [{**options, CONF_SOURCES: source_entities}]
+    else:
+        config = [{**options, CONF_SOURCE: entity_id} for entity_id in source_entities]
+    for index, entry_options in enumerate(config):
+        MockConfigEntry(
+            domain=DOMAIN,
+            options={**entry_options, CONF_NAME: f"benchmark{index}"},
+            entry_id=f"benchmark{index}",
+        ).add_to_hass(hass)
+
+    start = time.perf_counter()
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    startup = time.perf_counter() - start
+    entries = hass.config_entries.async_entries(DOMAIN)
+
+    samples = []
+    for index in range(ROUNDS * 2):
+        start = time.perf_counter()
+        hass.states.async_set(CONDITION_ENTITY, "on" if index % 2 == 0 else "off")
+        await hass.async_block_till_done()
+        for coordinator in coordinators(hass, entries):
+            await coordinator.async_on_heartbeat()
+        samples.append(time.perf_counter() - start)
+
+    report(
+        "sources",
+        size,
+        samples,
+        sources=sources,
+        multi=multi,
+        startup_ms=startup * 1000,
+    )
+    await unload_entries(hass, entries)
+
+
+@pytest.mark.parametrize("in_place", [True, False], ids=["in_place", "reload"])
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: "x".join(map(str, size)))
+async def test_reconfigure(hass: HomeAssistant, hass_storage, size, in_place):
+    """Add a sensor to every entry, or change an option that reloads the entry."""
+    entries = await setup_entries(hass, *size)
+
+    start = time.perf_counter()
+    for entry in entries:
+        if in_place:
+            added = {**sensors(1)[0], CONF_NAME: "added"}
+            options = {
+                **entry.options,
+                CONF_SENSORS: [*entry.options[CONF_SENSORS], added],
+            }
+        else:
+            options = {**entry.options, CONF_SAVE_INTERVAL: 30}
+        hass.config_entries.async_update_entry(entry, options=options)
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+
+    report("reconfigure", size, [elapsed], in_place=in_place)
+    await unload_entries(hass, entries)
+
+
+@pytest.mark.parametrize("shared", [False, True], ids=["entry_files", "shared"])
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: "x".join(map(str, size)))
+async def test_store_writes(hass: HomeAssistant, hass_storage, size, shared):
+    """Count the writes of a number of heartbeats, including the flush on unload."""
+    entries = await setup_entries(hass, *size, **{CONF_SHARED_STORE: shared})
+    writes = storage.Store._async_write_data
+    writes.reset_mock()
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for coordinator in coordinators(hass, entries):
+            await coordinator.async_on_heartbeat()
+    await unload_entries(hass, entries)
+    elapsed = time.perf_counter() - start
+
+    written = [
+        call.args[2]
+        for call in writes.call_args_list
+        if call.args[0].key.startswith(DOMAIN)
+    ]
+    report(
+        "store_writes",
+        size,
+        [elapsed],
+        heartbeats=ROUNDS,
+        shared=shared,
+        writes=len(written),
+        bytes=sum(len(json.dumps(data)) for data in written),
+    )
+
+
+def test_meter_memory():
+    tznow = dt_util.now()
+    patterns = sensors(MEMORY_METERS)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    baseline = tracemalloc.take_snapshot()
+    meters = [
+        Meter(sensor[CONF_NAME], Period(sensor[CONF_CRON], tznow))
+        for sensor in patterns
+    ]
+    elapsed = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(
+        stat.size_diff for stat in snapshot.compare_to(baseline, "filename")
+    )
+    report(
+        "meter_memory",
+        (1, len(meters)),
+        [elapsed],
+        bytes=allocated,
+        bytes_per_meter=allocated / len(meters),
+    )
+
+
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: "x".join(map(str, size)))
+def test_storage_schema(size):
+    """Compare the size and load time of a dict per meter and the columns."""
+    tznow = dt_util.now()
+    meters = {
+        sensor[CONF_NAME]: Meter.to_dict(
+            Meter(sensor[CONF_NAME], Period(sensor[CONF_CRON], tznow))
+        )
+        for sensor in sensors(size[0] * size[1])
+    }
+    version_1 = json.dumps(meters)
+    version_2 = json.dumps(encode(meters))
+
+    samples_1, samples_2 = [], []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        json.loads(version_1)
+        samples_1.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        decode(json.loads(version_2))
+        samples_2.append(time.perf_counter() - start)
+
+    report("storage_load_v1", size, samples_1, bytes=len(version_1))
+    report("storage_load_v2", size, samples_2, bytes=len(version_2))
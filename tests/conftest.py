@@ -14,9 +14,17 @@
 #
 # See here for more info: https://docs.pytest.org/en/latest/fixture.html (note that
 # pytest includes fixtures OOB which you can use as defined on this page)
+from typing import Any
 from unittest.mock import patch
 
 import pytest
+from custom_components.flexmeasure.const import COORDINATOR
+from custom_components.flexmeasure.const import DOMAIN
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_TIME_CONFIG_FINAL
 
 pytest_plugins = "pytest_homeassistant_custom_component"
 
@@ -40,6 +48,24 @@ def skip_notifications_fixture():
         yield
 
 
+# This fixture sets up a config entry with the given options, and returns it along
+# with its coordinator.
+@pytest.fixture(name="setup_entry")
+def setup_entry_fixture(hass: HomeAssistant):
+    """Set up a config entry of the integration."""
+
+    async def async_setup_entry(
+        options: dict[str, Any] = MOCK_TIME_CONFIG_FINAL, entry_id: str = "1234"
+    ):
+        entry = MockConfigEntry(domain=DOMAIN, options=options, entry_id=entry_id)
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        return entry, hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR]
+
+    return async_setup_entry
+
+
 # This fixture, when used, will result in calls to async_get_data to return None. To have the call
 # return a value, we would add the `return_value=<VALUE_TO_RETURN>` parameter to the patch call.
 # @pytest.fixture(name="bypass_get_data")
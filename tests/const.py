@@ -51,6 +51,23 @@ MOCK_SOURCE_CONFIG = {
     CONF_METER_TYPE: METER_TYPE_SOURCE,
 }
 
+MOCK_SOURCE_CONFIG_FINAL = {
+    CONF_NAME: "test_source",
+    CONF_METER_TYPE: METER_TYPE_SOURCE,
+    CONF_SOURCE: "sensor.energy",
+    CONF_TW_DAYS: ["0", "1", "2", "3", "4", "5", "6"],
+    CONF_TW_FROM: "00:00:00",
+    CONF_TW_TILL: "00:00:00",
+    CONF_SENSORS: [
+        {
+            CONF_NAME: "day",
+            CONF_CRON: PREDEFINED_PERIODS["day"],
+            CONF_UNIT_OF_MEASUREMENT: None,
+            CONF_VALUE_TEMPLATE: None,
+        },
+    ],
+}
+
 MOCK_TIMEBOX_CONFIG = {CONF_PERIODS: ["day", "5m"]}
 
 MOCK_TIME_CONFIG_NOTEMPLATE = {
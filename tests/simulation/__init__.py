@@ -0,0 +1 @@
+"""Simulation of flexmeasure on a virtual clock."""
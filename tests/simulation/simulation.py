@@ -0,0 +1,239 @@
+"""Run a config entry on a virtual clock, to try out configurations at scale.
+
+The entry is set up like any other, so the coordinator, the scheduler, batches,
+storage and the sensors all run as they do in Home Assistant. Only the clock is
+virtual: the time is read from it, and the timers of the integration and of the
+stores run when the clock passes them, so days of one minute ticks take seconds.
+
+The sensors throttle their writes on the real monotonic clock, as does the
+debouncer of sources that are tracked with a minimum interval, so those aren't
+simulated.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import Callable
+from unittest.mock import patch
+
+from custom_components.flexmeasure.const import ATTR_PREV
+from custom_components.flexmeasure.const import CONF_CONDITION
+from custom_components.flexmeasure.const import CONF_SOURCE
+from custom_components.flexmeasure.const import DOMAIN
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.const import SENSORS
+from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import Event
+from homeassistant.core import HassJob
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+CONDITION_ENTITY = "input_boolean.simulation"
+CONDITION = f"{{{{ is_state('{CONDITION_ENTITY}', 'on') }}}}"
+
+# where the clock is read and timers are set, so they're on the virtual clock
+CLOCK_TARGETS = {
+    "homeassistant.util.dt.utcnow": "utcnow",
+    "homeassistant.util.dt.now": "now",
+    "custom_components.flexmeasure.scheduler.async_track_point_in_utc_time": (
+        "async_track_point_in_utc_time"
+    ),
+    # the delayed writes of a Store
+    "homeassistant.helpers.event.async_call_later": "async_call_later",
+    "custom_components.flexmeasure.journal.async_call_later": "async_call_later",
+    "custom_components.flexmeasure.sensor.async_call_later": "async_call_later",
+}
+
+
+class VirtualClock:
+    """The time of the simulation, and the timers that run when it's passed."""
+
+    def __init__(self, start: datetime) -> None:
+        self.time: datetime = dt_util.as_utc(start)
+        self._timers: list[tuple[datetime, int, HassJob]] = []
+        self._cancelled: set[int] = set()
+        self._counter = itertools.count()
+
+    def utcnow(self) -> datetime:
+        return self.time
+
+    def now(self, time_zone=None) -> datetime:
+        return self.time.astimezone(time_zone or dt_util.DEFAULT_TIME_ZONE)
+
+    @callback
+    def async_track_point_in_utc_time(
+        self, hass: HomeAssistant, action: Callable | HassJob, point_in_time: datetime
+    ) -> CALLBACK_TYPE:
+        key = next(self._counter)
+        job = action if isinstance(action, HassJob) else HassJob(action)
+        heapq.heappush(self._timers, (dt_util.as_utc(point_in_time), key, job))
+
+        @callback
+        def cancel() -> None:
+            self._cancelled.add(key)
+
+        return cancel
+
+    @callback
+    def async_call_later(
+        self, hass: HomeAssistant, delay: float | timedelta, action: Callable | HassJob
+    ) -> CALLBACK_TYPE:
+        if not isinstance(delay, timedelta):
+            delay = timedelta(seconds=delay)
+        return self.async_track_point_in_utc_time(hass, action, self.time + delay)
+
+    async def async_move_to(self, hass: HomeAssistant, moment: datetime) -> None:
+        """Run the timers that are due before moment, each at its own time."""
+        moment = dt_util.as_utc(moment)
+        while self._timers and self._timers[0][0] < moment:
+            await self._async_run_next(hass)
+        self.time = moment
+
+    async def async_run_due(self, hass: HomeAssistant) -> None:
+        """Run the timers that are due now, including the ones they set for now."""
+        while self._timers and self._timers[0][0] <= self.time:
+            await self._async_run_next(hass)
+
+    async def _async_run_next(self, hass: HomeAssistant) -> None:
+        when, key, job = heapq.heappop(self._timers)
+        if key in self._cancelled:
+            self._cancelled.discard(key)
+            return
+        self.time = max(self.time, when)
+        hass.async_run_hass_job(job, when)
+        await hass.async_block_till_done()
+
+
+@dataclass
+class PeriodTotal:
+    start: datetime
+    end: datetime
+    value: float
+
+
+@dataclass
+class SimulationResult:
+    ticks: int
+    elapsed: float
+    # the totals of the closed periods, as written to the sensor states
+    totals: dict[str, list[PeriodTotal]] = field(default_factory=dict)
+
+    @property
+    def ticks_per_second(self) -> float:
+        return self.ticks / self.elapsed if self.elapsed else float("inf")
+
+
+class Simulation:
+    """Set up an entry with options, and feed it synthetic readings and conditions.
+
+    reading and condition are called with the virtual time of every tick. The
+    reading is the state of the source entity of a source meter. The condition is
+    the state of an input boolean the entry gets as its condition, without one
+    the entry has no condition.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        options: dict[str, Any],
+        reading: Callable[[datetime], float] | None = None,
+        condition: Callable[[datetime], bool] | None = None,
+        step: timedelta = timedelta(minutes=1),
+    ) -> None:
+        self._hass: HomeAssistant = hass
+        self._options: dict[str, Any] = dict(options)
+        if condition:
+            self._options[CONF_CONDITION] = CONDITION
+        self._reading = reading
+        self._condition = condition
+        self._step: float = step.total_seconds()
+        self.entry: MockConfigEntry | None = None
+
+    async def async_run(self, start: datetime, end: datetime) -> SimulationResult:
+        """Tick from start until end, both timezone aware, and unload the entry."""
+        hass = self._hass
+        clock = VirtualClock(start)
+        patches = [
+            patch(target, getattr(clock, name))
+            for target, name in CLOCK_TARGETS.items()
+        ]
+        for clock_patch in patches:
+            clock_patch.start()
+        try:
+            self._set_states(clock.now())
+            self.entry = entry = MockConfigEntry(domain=DOMAIN, options=self._options)
+            entry.add_to_hass(hass)
+            await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+            result = SimulationResult(0, 0)
+            unsub = self._async_track_totals(entry.entry_id, result)
+
+            timestamp, end_timestamp = start.timestamp(), end.timestamp()
+            started = time.perf_counter()
+            while (timestamp := timestamp + self._step) <= end_timestamp:
+                await clock.async_move_to(hass, dt_util.utc_from_timestamp(timestamp))
+                self._set_states(clock.now())
+                await hass.async_block_till_done()
+                await clock.async_run_due(hass)
+                result.ticks += 1
+            result.elapsed = time.perf_counter() - started
+
+            unsub()
+            await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+        finally:
+            for clock_patch in patches:
+                clock_patch.stop()
+        return result
+
+    @callback
+    def _set_states(self, tznow: datetime) -> None:
+        # only changes are written, like a real source or condition
+        if self._reading:
+            self._hass.states.async_set(
+                self._options[CONF_SOURCE], str(self._reading(tznow))
+            )
+        if self._condition:
+            self._hass.states.async_set(
+                CONDITION_ENTITY, "on" if self._condition(tznow) else "off"
+            )
+
+    @callback
+    def _async_track_totals(
+        self, entry_id: str, result: SimulationResult
+    ) -> CALLBACK_TYPE:
+        sensors = {
+            sensor.entity_id: sensor.pattern_name
+            for sensor in self._hass.data[DOMAIN_DATA][entry_id][SENSORS]
+        }
+        result.totals = {name: [] for name in sensors.values()}
+
+        @callback
+        def async_on_state_change(event: Event) -> None:
+            old_state = event.data.get("old_state")
+            new_state = event.data.get("new_state")
+            if old_state is None or new_state is None:
+                return
+            start = old_state.attributes.get("last_reset")
+            end = new_state.attributes.get("last_reset")
+            if start != end:
+                result.totals[sensors[event.data["entity_id"]]].append(
+                    PeriodTotal(
+                        dt_util.parse_datetime(start),
+                        dt_util.parse_datetime(end),
+                        new_state.attributes[ATTR_PREV],
+                    )
+                )
+
+        return async_track_state_change_event(
+            self._hass, list(sensors), async_on_state_change
+        )
@@ -0,0 +1,90 @@
+from datetime import datetime
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from custom_components.flexmeasure.const import CONF_BATCH
+from custom_components.flexmeasure.const import CONF_CRON
+from custom_components.flexmeasure.const import CONF_SENSORS
+from custom_components.flexmeasure.const import CONF_TW_FROM
+from custom_components.flexmeasure.const import CONF_TW_TILL
+from custom_components.flexmeasure.const import PREDEFINED_PERIODS
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant
+
+from ..const import MOCK_SOURCE_CONFIG_FINAL
+from ..const import MOCK_TIME_CONFIG_FINAL
+from .simulation import Simulation
+
+TZ = ZoneInfo("Europe/Amsterdam")
+
+
+@pytest.fixture(autouse=True)
+def time_zone(hass: HomeAssistant):
+    hass.config.set_time_zone("Europe/Amsterdam")
+
+
+def sensors(*names: str) -> list[dict]:
+    return [{CONF_NAME: name, CONF_CRON: PREDEFINED_PERIODS[name]} for name in names]
+
+
+@pytest.mark.parametrize("batch", [False, True])
+async def test_days_across_dst(hass: HomeAssistant, hass_storage, batch):
+    simulation = Simulation(
+        hass,
+        {
+            **MOCK_TIME_CONFIG_FINAL,
+            CONF_SENSORS: sensors("day", "hour"),
+            CONF_BATCH: batch,
+        },
+    )
+    result = await simulation.async_run(
+        datetime(2022, 3, 26, tzinfo=TZ), datetime(2022, 3, 29, tzinfo=TZ)
+    )
+
+    assert result.ticks == 3 * 24 * 60 - 60
+    assert [total.value for total in result.totals["day"]] == [
+        86400,
+        23 * 3600,
+        86400,
+    ]
+    assert len(result.totals["hour"]) == 3 * 24 - 1
+    assert all(total.value == 3600 for total in result.totals["hour"])
+    assert result.totals["day"][1].start == datetime(2022, 3, 27, tzinfo=TZ)
+
+    # the meters were saved at their last reset
+    stored = hass_storage[f"flexmeasure_{simulation.entry.entry_id}"]["data"]
+    assert stored["name"] == ["test_configname_day", "test_configname_hour"]
+    assert stored["prev_measured_value"] == [86400, 3600]
+
+
+async def test_condition_and_time_window(hass: HomeAssistant):
+    # measures from 8:00 until 12:00, but only within the window starting at 10:00
+    simulation = Simulation(
+        hass,
+        {
+            **MOCK_TIME_CONFIG_FINAL,
+            CONF_SENSORS: sensors("day"),
+            CONF_TW_FROM: "10:00:00",
+            CONF_TW_TILL: "23:00:00",
+        },
+        condition=lambda tznow: 8 <= tznow.hour < 12,
+    )
+    result = await simulation.async_run(
+        datetime(2022, 1, 1, tzinfo=TZ), datetime(2022, 1, 8, tzinfo=TZ)
+    )
+    assert [total.value for total in result.totals["day"]] == [2 * 3600] * 7
+
+
+async def test_source_readings(hass: HomeAssistant):
+    # a source increasing 1 per minute, for a day of 5 minute periods
+    start = datetime(2022, 1, 1, tzinfo=TZ)
+    simulation = Simulation(
+        hass,
+        {**MOCK_SOURCE_CONFIG_FINAL, CONF_SENSORS: sensors("5m")},
+        reading=lambda tznow: (tznow - start) / timedelta(minutes=1),
+    )
+    result = await simulation.async_run(start, start + timedelta(days=1))
+    assert len(result.totals["5m"]) == 24 * 12
+    assert all(total.value == 5 for total in result.totals["5m"])
+    assert result.ticks_per_second > 0
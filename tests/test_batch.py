@@ -0,0 +1,75 @@
+from datetime import datetime
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from custom_components.flexmeasure.batch import MeterBatch
+from custom_components.flexmeasure.const import PREDEFINED_PERIODS
+from custom_components.flexmeasure.meter import Meter
+from custom_components.flexmeasure.meter import MeterState
+from custom_components.flexmeasure.period import Period
+
+TZ = ZoneInfo("Europe/Amsterdam")
+PATTERNS = ["hour", "day", "week", "month"]
+
+
+def test_same_as_meters():
+    start = datetime(2022, 3, 25, 10, 30, tzinfo=TZ)
+    batch = MeterBatch(len(PATTERNS))
+    batch_meters = [
+        batch.add(name, Period(PREDEFINED_PERIODS[name], start)) for name in PATTERNS
+    ]
+    meters = [Meter(name, Period(PREDEFINED_PERIODS[name], start)) for name in PATTERNS]
+
+    # the condition flips every 7 ticks and the time window every 11, across DST
+    tznow = start
+    for tick in range(2000):
+        tznow += timedelta(minutes=7)
+        reading = tick * 3.5
+        tw_active = tick % 11 < 8
+        if tick % 7 == 0:
+            condition = tick % 14 == 0
+            batch.on_template_change(tznow, reading, condition, tw_active)
+            for meter in meters:
+                meter.on_template_change(tznow, reading, condition, tw_active)
+        else:
+            batch.on_heartbeat(tznow, reading, tw_active)
+            for meter in meters:
+                meter.on_heartbeat(tznow, reading, tw_active)
+
+        dirty = batch.pop_dirty()
+        for batch_meter, meter in zip(batch_meters, meters):
+            assert Meter.to_dict(batch_meter) == Meter.to_dict(meter)
+            if meter.dirty:
+                assert dirty.pop(meter.name) == Meter.to_dict(meter)
+            meter.dirty = False
+        assert not dirty
+
+    assert batch.next_reset_timestamp == min(
+        meter.next_reset_timestamp for meter in meters
+    )
+
+
+def test_restore():
+    start = datetime(2022, 1, 1, 10, 30, tzinfo=TZ)
+    meter = Meter("day", Period(PREDEFINED_PERIODS["day"], start))
+    meter.disable_template()
+    meter.on_heartbeat(start, 100, True)
+    meter.on_heartbeat(start + timedelta(hours=1), 110, True)
+
+    # restored a day later, the reset is still due
+    later = start + timedelta(days=1)
+    batch = MeterBatch(1)
+    restored = Meter.from_dict(
+        Meter.to_dict(meter), batch.add("day", Period(PREDEFINED_PERIODS["day"], later))
+    )
+    batch.sync()
+    assert restored.state == MeterState.MEASURING
+    assert restored.measured_value == 10
+    assert restored._session_start_reading == 100
+
+    restored.disable_template()
+    batch.on_heartbeat(later, 150, True)
+    assert restored.prev_measured_value == 50
+    assert restored.measured_value == 0
+    assert list(batch.pop_dirty()) == ["day"]
+    assert not restored.dirty
@@ -0,0 +1,98 @@
+from unittest.mock import patch
+
+from custom_components.flexmeasure.condition import async_get_conditions
+from custom_components.flexmeasure.const import CONDITIONS
+from custom_components.flexmeasure.const import CONF_CONDITION
+from custom_components.flexmeasure.const import COORDINATOR
+from custom_components.flexmeasure.const import DOMAIN
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.meter import MeterState
+from homeassistant.const import CONF_NAME
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import event
+from homeassistant.helpers.template import Template
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_TIME_CONFIG_FINAL
+
+CONDITION = "{{ is_state('input_boolean.test', 'on') }}"
+
+
+async def test_shared_registry(hass: HomeAssistant):
+    conditions = async_get_conditions(hass)
+    assert hass.data[DOMAIN_DATA][CONDITIONS] is conditions
+    assert async_get_conditions(hass) is conditions
+
+
+async def test_subscribers_share_a_listener(hass: HomeAssistant):
+    hass.states.async_set("input_boolean.test", "off")
+    conditions = async_get_conditions(hass)
+    results = {"one": [], "two": []}
+
+    def subscriber(name):
+        @callback
+        def action(_event, result):
+            results[name].append(result)
+
+        return action
+
+    with patch(
+        "custom_components.flexmeasure.condition.async_track_template_result",
+        wraps=event.async_track_template_result,
+    ) as track:
+        unsub_one = conditions.async_subscribe(Template(CONDITION), subscriber("one"))
+        # a later subscriber gets the last result right away
+        unsub_two = conditions.async_subscribe(Template(CONDITION), subscriber("two"))
+        assert track.call_count == 1
+    assert conditions.templates == 1
+    assert results == {"one": [False], "two": [False]}
+
+    hass.states.async_set("input_boolean.test", "on")
+    await hass.async_block_till_done()
+    assert results == {"one": [False, True], "two": [False, True]}
+
+    unsub_one()
+    hass.states.async_set("input_boolean.test", "off")
+    await hass.async_block_till_done()
+    assert results == {"one": [False, True], "two": [False, True, False]}
+
+    # the listener is removed with the last subscriber
+    unsub_two()
+    assert conditions.templates == 0
+    hass.states.async_set("input_boolean.test", "on")
+    await hass.async_block_till_done()
+    assert results["two"] == [False, True, False]
+
+
+async def test_entries_with_the_same_condition(hass: HomeAssistant):
+    hass.states.async_set("input_boolean.test", "off")
+    for index in range(3):
+        MockConfigEntry(
+            domain=DOMAIN,
+            options={
+                **MOCK_TIME_CONFIG_FINAL,
+                CONF_NAME: f"entry{index}",
+                CONF_CONDITION: CONDITION,
+            },
+            entry_id=f"entry{index}",
+        ).add_to_hass(hass)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    conditions = async_get_conditions(hass)
+    assert conditions.templates == 1
+
+    hass.states.async_set("input_boolean.test", "on")
+    await hass.async_block_till_done()
+    for index in range(3):
+        coordinator = hass.data[DOMAIN_DATA][f"entry{index}"][COORDINATOR]
+        assert coordinator.get_meter("day").state == MeterState.MEASURING
+
+    await hass.config_entries.async_unload("entry0")
+    await hass.async_block_till_done()
+    assert conditions.templates == 1
+    for index in range(1, 3):
+        await hass.config_entries.async_unload(f"entry{index}")
+    await hass.async_block_till_done()
+    assert conditions.templates == 0
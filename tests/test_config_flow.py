@@ -2,14 +2,24 @@
 from unittest.mock import patch
 
 import pytest
+from custom_components.flexmeasure.const import CONF_LAZY
+from custom_components.flexmeasure.const import CONF_MIN_INTERVAL
+from custom_components.flexmeasure.const import CONF_REFRESH_INTERVAL
+from custom_components.flexmeasure.const import CONF_SAVE_INTERVAL
+from custom_components.flexmeasure.const import CONF_SOURCES
+from custom_components.flexmeasure.const import CONF_TIME_WINDOWS
+from custom_components.flexmeasure.const import CONF_TRACK_SOURCE
+from custom_components.flexmeasure.const import CONF_TW_DAYS
+from custom_components.flexmeasure.const import CONF_TW_FROM
+from custom_components.flexmeasure.const import CONF_TW_TILL
 from custom_components.flexmeasure.const import DOMAIN
 from homeassistant import config_entries
 from homeassistant import data_entry_flow
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from .const import MOCK_SOURCE_CONFIG_FINAL
 from .const import MOCK_TIME_CONFIG_FINAL
 
-# from pytest_homeassistant_custom_component.common import MockConfigEntry
-
 
 # This fixture bypasses the actual setup of the integration
 # since we only want to test the config flow. We test the
@@ -106,29 +116,141 @@ async def test_successful_config_flow(hass):
 
 
 # Our config flow also has an options flow, so we must test it as well.
-# async def test_options_flow(hass):
-#     """Test an options flow."""
-#     # Create a new MockConfigEntry and add to HASS (we're bypassing config
-#     # flow entirely)
-#     entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
-#     entry.add_to_hass(hass)
+async def test_options_flow(hass):
+    """Test changing the settings of a time meter."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, options=MOCK_TIME_CONFIG_FINAL, entry_id="test"
+    )
+    entry.add_to_hass(hass)
 
-#     # Initialize an options flow
-#     result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == data_entry_flow.RESULT_TYPE_MENU
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "settings"}
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert CONF_TRACK_SOURCE not in result["data_schema"].schema
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            CONF_LAZY: True,
+            CONF_REFRESH_INTERVAL: 600.0,
+            CONF_SAVE_INTERVAL: 30.0,
+        },
+    )
+    assert result["step_id"] == "init"
 
-#     # Verify that the first options step is a user form
-#     assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
-#     assert result["step_id"] == "user"
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "done"}
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert entry.options[CONF_LAZY] is True
+    assert entry.options[CONF_REFRESH_INTERVAL] == 600
+    assert entry.options[CONF_SAVE_INTERVAL] == 30
+    assert isinstance(entry.options[CONF_SAVE_INTERVAL], int)
 
-#     # Enter some fake data into the form
-#     result = await hass.config_entries.options.async_configure(
-#         result["flow_id"],
-#         user_input={platform: platform != SENSOR for platform in PLATFORMS},
-#     )
 
-#     # Verify that the flow finishes
-#     assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
-#     assert result["title"] == "test_username"
+async def test_options_flow_source(hass):
+    """Test changing the settings of a source meter."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, options=MOCK_SOURCE_CONFIG_FINAL, entry_id="test"
+    )
+    entry.add_to_hass(hass)
 
-#     # Verify that the options were updated
-#     assert entry.options == {BINARY_SENSOR: True, SENSOR: False, SWITCH: True}
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "settings"}
+    )
+    assert CONF_LAZY not in result["data_schema"].schema
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_TRACK_SOURCE: True, CONF_MIN_INTERVAL: 5.0},
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "done"}
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert entry.options[CONF_TRACK_SOURCE] is True
+    assert entry.options[CONF_MIN_INTERVAL] == 5
+
+
+async def test_options_flow_time_windows(hass):
+    """Test adding and removing time windows."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, options=MOCK_TIME_CONFIG_FINAL, entry_id="test"
+    )
+    entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["menu_options"] == ["settings", "time_window", "done"]
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "time_window"}
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_TW_DAYS: [], CONF_TW_FROM: "08:00", CONF_TW_TILL: "09:00"},
+    )
+    assert result["errors"] == {CONF_TW_DAYS: "at_least_one_day"}
+    window = {CONF_TW_DAYS: ["5", "6"], CONF_TW_FROM: "08:00", CONF_TW_TILL: "09:00"}
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input=window
+    )
+    assert result["menu_options"] == [
+        "settings",
+        "time_window",
+        "clear_time_windows",
+        "done",
+    ]
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "done"}
+    )
+    assert entry.options[CONF_TIME_WINDOWS] == [window]
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "clear_time_windows"}
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "done"}
+    )
+    assert entry.options == MOCK_TIME_CONFIG_FINAL
+
+
+async def test_options_flow_sources(hass):
+    """Test changing the sources of a source meter."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, options=MOCK_SOURCE_CONFIG_FINAL, entry_id="test"
+    )
+    entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["menu_options"] == ["settings", "sources", "time_window", "done"]
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "sources"}
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_SOURCES: ["sensor.kitchen", "input_number.kitchen"]},
+    )
+    assert result["errors"] == {CONF_SOURCES: "duplicate_object_id"}
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_SOURCES: ["sensor.kitchen", "sensor.garage"]},
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "done"}
+    )
+    assert entry.options[CONF_SOURCES] == ["sensor.kitchen", "sensor.garage"]
+
+    # without sources, the source entity is measured again
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "sources"}
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={CONF_SOURCES: []}
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": "done"}
+    )
+    assert entry.options == MOCK_SOURCE_CONFIG_FINAL
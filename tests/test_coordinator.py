@@ -1,14 +1,35 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock
 from unittest.mock import Mock
 
+import homeassistant.util.dt as dt_util
+from custom_components.flexmeasure.batch import BatchMeter
+from custom_components.flexmeasure.const import CONF_BATCH
+from custom_components.flexmeasure.const import CONF_LAZY
+from custom_components.flexmeasure.const import CONF_REFRESH_INTERVAL
+from custom_components.flexmeasure.const import CONF_SOURCES
+from custom_components.flexmeasure.const import CONF_TIME_WINDOWS
+from custom_components.flexmeasure.const import CONF_TRACK_SOURCE
+from custom_components.flexmeasure.const import CONF_TW_DAYS
+from custom_components.flexmeasure.const import CONF_TW_FROM
+from custom_components.flexmeasure.const import CONF_TW_TILL
 from custom_components.flexmeasure.const import COORDINATOR
 from custom_components.flexmeasure.const import DOMAIN
 from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.const import PREDEFINED_PERIODS
 from custom_components.flexmeasure.coordinator import FlexMeasureCoordinator
+from custom_components.flexmeasure.meter import LazyTimeMeter
+from custom_components.flexmeasure.meter import Meter
 from custom_components.flexmeasure.meter import MeterState
+from custom_components.flexmeasure.period import Period
+from custom_components.flexmeasure.store import decode
 from custom_components.flexmeasure.time_window import TimeWindow
+from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import HomeAssistant
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from .const import MOCK_SOURCE_CONFIG_FINAL
 from .const import MOCK_TIME_CONFIG_FINAL
 
 
@@ -30,7 +51,6 @@ async def test_coordinator_happy_flow(hass: HomeAssistant):
 
 # coordinator should use lastest reading in case the value is rubbish
 async def test_value_error(hass: HomeAssistant):
-
     meter = Mock()
     meter.disable_template.return_value = None
     meter.on_heartbeat.return_value = None
@@ -53,3 +73,188 @@ async def test_value_error(hass: HomeAssistant):
     meter.reset_mock()
     await coordinator._async_update_meters()
     assert meter.on_heartbeat.called
+
+
+async def test_delayed_save(hass: HomeAssistant, hass_storage, setup_entry):
+    entry, _ = await setup_entry()
+
+    # changes are saved after the save interval, not on every update
+    assert "flexmeasure_1234" not in hass_storage
+
+    # pending changes are flushed when the coordinator stops
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    data = decode(hass_storage["flexmeasure_1234"]["data"])
+    assert data["test_configname_day"]["state"] == MeterState.MEASURING
+
+
+async def test_track_source(hass: HomeAssistant, setup_entry):
+    hass.states.async_set("sensor.energy", "10")
+    _, coordinator = await setup_entry(
+        {**MOCK_SOURCE_CONFIG_FINAL, CONF_TRACK_SOURCE: True}
+    )
+    assert coordinator._meters["day"].state == MeterState.MEASURING
+
+    # the meters follow the source without waiting for a heartbeat
+    hass.states.async_set("sensor.energy", "15")
+    await hass.async_block_till_done()
+    assert coordinator._meters["day"].measured_value == 5
+
+    # nothing to do for the heartbeat until the next reset
+    assert coordinator.next_heartbeat() == dt_util.as_utc(
+        coordinator._meters["day"].next_reset
+    )
+
+
+async def test_next_heartbeat(hass: HomeAssistant, setup_entry):
+    _, coordinator = await setup_entry()
+
+    # measuring time meters are refreshed every minute
+    next_minute = dt_util.utcnow().replace(second=0, microsecond=0) + timedelta(
+        minutes=1
+    )
+    assert coordinator.next_heartbeat() == next_minute
+
+    # idle meters only wake up at the next reset
+    for meter in coordinator.meters:
+        meter.state = MeterState.WAITING_FOR_CONDITION
+    assert coordinator.next_heartbeat() == dt_util.as_utc(
+        coordinator._meters["day"].next_reset
+    )
+
+
+async def test_lazy_time_meters(hass: HomeAssistant, setup_entry):
+    _, coordinator = await setup_entry(
+        {**MOCK_TIME_CONFIG_FINAL, CONF_LAZY: True, CONF_REFRESH_INTERVAL: 0}
+    )
+    meter = coordinator._meters["day"]
+    assert isinstance(meter, LazyTimeMeter)
+    assert meter.state == MeterState.MEASURING
+
+    # measuring lazy meters don't need a heartbeat before the next reset
+    assert coordinator.next_heartbeat() == dt_util.as_utc(meter.next_reset)
+
+
+async def test_batch(hass: HomeAssistant, hass_storage, setup_entry):
+    entry, coordinator = await setup_entry({**MOCK_TIME_CONFIG_FINAL, CONF_BATCH: True})
+    meter = coordinator._meters["day"]
+    assert isinstance(meter, BatchMeter)
+    assert meter.state == MeterState.MEASURING
+    assert coordinator.next_heartbeat() == dt_util.utcnow().replace(
+        second=0, microsecond=0
+    ) + timedelta(minutes=1)
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    data = decode(hass_storage["flexmeasure_1234"]["data"])
+    assert data["test_configname_day"]["state"] == MeterState.MEASURING
+    assert data["test_configname_day"]["session_start_reading"] is not None
+
+
+async def test_coalesce_updates(hass: HomeAssistant):
+    saved = asyncio.Event()
+
+    async def async_save(data):
+        await saved.wait()
+
+    store = Mock()
+    store.async_save = AsyncMock(side_effect=async_save)
+    meter = Meter("day", Period(PREDEFINED_PERIODS["day"], dt_util.now()))
+    value_func = Mock(side_effect=[100, 110, 120, 130])
+    coordinator = FlexMeasureCoordinator(
+        hass,
+        "test_config",
+        store,
+        {"day": meter},
+        None,
+        TimeWindow(["0", "1", "2", "3", "4", "5", "6"], "00:00:00", "00:00:00"),
+        value_func,
+        save_interval=0,
+    )
+
+    # the condition flaps while the first update is being saved
+    first = hass.async_create_task(coordinator._async_update_meters(True))
+    await asyncio.sleep(0)
+    assert meter.state == MeterState.MEASURING
+    await coordinator._async_update_meters(False)
+    await coordinator._async_update_meters(True)
+    await coordinator._async_update_meters(False)
+    assert store.async_save.await_count == 1
+
+    # the flips are applied in order in a single pass
+    saved.set()
+    await first
+    assert store.async_save.await_count == 2
+    assert meter.state == MeterState.WAITING_FOR_CONDITION
+    assert meter.measured_value == 20
+
+
+async def test_multiple_time_windows(hass: HomeAssistant, setup_entry):
+    _, coordinator = await setup_entry(
+        {
+            **MOCK_TIME_CONFIG_FINAL,
+            CONF_TW_DAYS: [],
+            CONF_TIME_WINDOWS: [
+                {
+                    CONF_TW_DAYS: ["0", "1", "2", "3", "4", "5", "6"],
+                    CONF_TW_FROM: "00:00:00",
+                    CONF_TW_TILL: "00:00:00",
+                }
+            ],
+        }
+    )
+    assert coordinator._meters["day"].state == MeterState.MEASURING
+
+
+async def test_multiple_sources(hass: HomeAssistant, hass_storage, setup_entry):
+    hass.states.async_set("sensor.kitchen", "10")
+    hass.states.async_set("sensor.garage", "100")
+    entry, coordinator = await setup_entry(
+        {
+            **MOCK_SOURCE_CONFIG_FINAL,
+            CONF_SOURCES: ["sensor.missing", "sensor.kitchen", "sensor.garage"],
+            CONF_TRACK_SOURCE: True,
+        }
+    )
+    assert sorted(coordinator._meters) == ["garage_day", "kitchen_day", "missing_day"]
+    assert hass.states.get("sensor.test_source_kitchen_day")
+
+    # every meter measures its own source, a missing source doesn't hold up others
+    hass.states.async_set("sensor.kitchen", "15")
+    hass.states.async_set("sensor.garage", "130")
+    await hass.async_block_till_done()
+    assert coordinator._meters["kitchen_day"].measured_value == 5
+    assert coordinator._meters["garage_day"].measured_value == 30
+    assert coordinator._meters["missing_day"].state is None
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    data = decode(hass_storage["flexmeasure_1234"]["data"])
+    assert data["test_source_garage_day"]["measured_value"] == 30
+    assert data["test_source_missing_day"]["state"] is None
+
+    # the meter without a state doesn't keep the meters after it from restoring
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR]
+    assert coordinator._meters["kitchen_day"].measured_value == 5
+    assert coordinator._meters["garage_day"].measured_value == 30
+    assert coordinator._meters["missing_day"].state is None
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_sources_with_the_same_object_id(hass: HomeAssistant):
+    # both would name their sensors kitchen_day
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        options={
+            **MOCK_SOURCE_CONFIG_FINAL,
+            CONF_SOURCES: ["sensor.kitchen", "input_number.kitchen"],
+        },
+    )
+    entry.add_to_hass(hass)
+    assert not await hass.config_entries.async_setup(entry.entry_id)
+    assert entry.state == ConfigEntryState.SETUP_ERROR
+    assert not hass.states.async_entity_ids("sensor")
@@ -0,0 +1,180 @@
+import random
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+import pytz
+from croniter import croniter
+from custom_components.flexmeasure.const import PREDEFINED_PERIODS
+from custom_components.flexmeasure.cron import boundary_cache
+from custom_components.flexmeasure.cron import CACHE_SIZE
+from custom_components.flexmeasure.cron import get_next
+from custom_components.flexmeasure.cron import get_period
+from custom_components.flexmeasure.cron import get_prev
+from custom_components.flexmeasure.cron import is_native
+from custom_components.flexmeasure.period import Period
+
+TZ = ZoneInfo("Europe/Amsterdam")
+
+ALIGNED = {
+    "5m": lambda wall: wall.minute % 5 == 0,
+    "hour": lambda wall: wall.minute == 0,
+    "day": lambda wall: wall.hour == wall.minute == 0,
+    "week": lambda wall: wall.hour == wall.minute == wall.weekday() == 0,
+    "month": lambda wall: wall.hour == wall.minute == 0 and wall.day == 1,
+    "year": lambda wall: wall.hour == wall.minute == 0 and wall.day == wall.month == 1,
+}
+
+
+def after_dst_change(boundary: datetime) -> bool:
+    before = datetime.fromtimestamp(boundary.timestamp() - 1, boundary.tzinfo)
+    return before.utcoffset() != boundary.utcoffset()
+
+
+def assert_boundary(name: str, boundary: datetime):
+    wall = boundary.replace(tzinfo=None)
+    assert wall.second == wall.microsecond == 0
+    # a boundary in a DST gap starts when the gap ends
+    assert ALIGNED[name](wall) or after_dst_change(boundary)
+
+
+@pytest.mark.parametrize(
+    "tz",
+    [
+        ZoneInfo("Europe/Amsterdam"),
+        ZoneInfo("America/New_York"),
+        ZoneInfo("Asia/Kolkata"),
+        ZoneInfo("America/Santiago"),
+        pytz.timezone("Europe/Amsterdam"),
+    ],
+    ids=str,
+)
+def test_predefined_agree_with_croniter(tz):
+    """Compare with croniter over several years of random timestamps.
+
+    croniter 1.3 gets periods wrong when the utc offset changes within them, or
+    right before them, so in that case the boundaries are only checked to be on
+    the wall clock.
+    """
+    rnd = random.Random(str(tz))
+    timestamp = datetime(2021, 1, 1, tzinfo=timezone.utc).timestamp()
+    end = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    compared = 0
+
+    while timestamp < end:
+        timestamp += rnd.randint(1, 400000)
+        tznow = datetime.fromtimestamp(timestamp, tz)
+
+        for name, pattern in PREDEFINED_PERIODS.items():
+            if not is_native(pattern):
+                continue
+            start = get_prev(pattern, tznow)
+            end_ = get_next(pattern, start)
+            assert start < tznow <= end_
+            assert_boundary(name, start)
+            assert_boundary(name, end_)
+
+            if (
+                start.utcoffset() == tznow.utcoffset() == end_.utcoffset()
+                and not after_dst_change(start)
+            ):
+                compared += 1
+                cron_start = croniter(pattern, tznow).get_prev(datetime)
+                assert start == cron_start
+                assert end_ == croniter(pattern, cron_start).get_next(datetime)
+
+    assert compared > 1000
+
+
+def test_exact_boundary():
+    # like croniter, the previous boundary is strictly before the given time
+    tznow = datetime(2022, 1, 1, tzinfo=TZ)
+    assert get_prev(PREDEFINED_PERIODS["day"], tznow) == tznow - timedelta(days=1)
+    assert get_next(PREDEFINED_PERIODS["day"], tznow) == tznow + timedelta(days=1)
+
+    tznow = datetime(2022, 1, 1, 0, 0, 0, 1, tzinfo=TZ)
+    assert get_prev(PREDEFINED_PERIODS["5m"], tznow) == datetime(2022, 1, 1, tzinfo=TZ)
+
+
+def test_day_on_dst_changes():
+    day = PREDEFINED_PERIODS["day"]
+
+    start = get_prev(day, datetime(2022, 3, 27, 12, 0, tzinfo=TZ))
+    end = get_next(day, start)
+    assert start == datetime(2022, 3, 27, tzinfo=TZ)
+    assert end == datetime(2022, 3, 28, tzinfo=TZ)
+    assert end.timestamp() - start.timestamp() == 23 * 3600
+
+    start = get_prev(day, datetime(2022, 10, 30, 12, 0, tzinfo=TZ))
+    end = get_next(day, start)
+    assert end.timestamp() - start.timestamp() == 25 * 3600
+
+
+def test_hour_on_dst_changes():
+    hour = PREDEFINED_PERIODS["hour"]
+
+    # 02:00 - 03:00 is skipped
+    start = get_prev(hour, datetime(2022, 3, 27, 1, 30, tzinfo=TZ))
+    assert get_next(hour, start) == datetime(2022, 3, 27, 3, 0, tzinfo=TZ)
+
+    # 02:00 - 03:00 occurs twice
+    start = datetime(2022, 10, 30, 2, 0, tzinfo=TZ)
+    end = get_next(hour, start)
+    assert end == datetime(2022, 10, 30, 2, 0, fold=1, tzinfo=TZ)
+    assert end.utcoffset() == timedelta(hours=1)
+
+
+def test_midnight_in_dst_gap():
+    # Santiago skips 00:00 - 01:00 when DST starts
+    tz = ZoneInfo("America/Santiago")
+    start = get_prev(PREDEFINED_PERIODS["day"], datetime(2022, 9, 11, 12, 0, tzinfo=tz))
+    assert start == datetime(2022, 9, 11, 1, 0, tzinfo=tz)
+
+
+def test_custom_pattern():
+    pattern = "30 6 * * 2"
+    tznow = datetime(2022, 1, 1, 12, 0, tzinfo=TZ)
+    assert not is_native(pattern)
+    assert get_prev(pattern, tznow) == croniter(pattern, tznow).get_prev(datetime)
+    assert get_next(pattern, tznow) == croniter(pattern, tznow).get_next(datetime)
+
+
+def test_boundary_cache():
+    boundary_cache.clear()
+    pattern = PREDEFINED_PERIODS["day"]
+    tznow = datetime(2022, 1, 1, 10, 30, tzinfo=TZ)
+
+    # meters with the same pattern share the calculation of their period
+    periods = [Period(pattern, tznow + timedelta(minutes=i)) for i in range(10)]
+    assert boundary_cache.misses == 0  # until first used
+    assert {period.end for period in periods} == {datetime(2022, 1, 2, tzinfo=TZ)}
+    assert boundary_cache.misses == 2
+
+    # and of the next boundary when they roll over
+    tznow = datetime(2022, 1, 2, 0, 0, tzinfo=TZ)
+    for period in periods:
+        period.update(tznow, lambda *args: None, 0)
+    assert boundary_cache.misses == 3
+    assert {period.end for period in periods} == {datetime(2022, 1, 3, tzinfo=TZ)}
+
+    # the cache is bounded
+    for day in range(CACHE_SIZE + 10):
+        get_next(pattern, tznow + timedelta(days=day))
+    assert len(boundary_cache._next) == CACHE_SIZE
+
+
+def test_boundary_cache_fold():
+    boundary_cache.clear()
+    pattern = "*/5 * * * *"
+    first = datetime(2022, 10, 30, 2, 3, tzinfo=TZ)
+    second = datetime(2022, 10, 30, 2, 3, fold=1, tzinfo=TZ)
+    start, end = get_period(pattern, first)
+    assert (start.utcoffset(), end.utcoffset()) == (timedelta(hours=2),) * 2
+
+    # the cached period of the first 02:03 isn't the period of the second one
+    start, end = get_period(pattern, second)
+    assert start.timestamp() == second.timestamp() - 180
+    assert end.timestamp() == second.timestamp() + 120
+    assert boundary_cache.misses == 4
@@ -1,10 +1,22 @@
 """Test flexmeasure setup process."""
 # import pytest
+from unittest.mock import patch
+
 from custom_components.flexmeasure import async_reload_entry
 from custom_components.flexmeasure import async_unload_entry
+from custom_components.flexmeasure.const import CONF_CONDITION
+from custom_components.flexmeasure.const import CONF_CRON
+from custom_components.flexmeasure.const import CONF_SENSORS
+from custom_components.flexmeasure.const import COORDINATOR
 from custom_components.flexmeasure.const import DOMAIN
 from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.const import PREDEFINED_PERIODS
+from custom_components.flexmeasure.const import PRELOADS
+from custom_components.flexmeasure.meter import MeterState
+from custom_components.flexmeasure.store import MeterStore
+from homeassistant.const import CONF_NAME
 from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from .const import MOCK_TIME_CONFIG_FINAL
@@ -32,3 +44,98 @@ async def test_remove_entry(hass: HomeAssistant):
 
     await async_unload_entry(hass, entry)
     assert hass.data[DOMAIN_DATA].get(entry.entry_id) is None
+
+
+async def test_preload(hass: HomeAssistant):
+    entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            options={**MOCK_TIME_CONFIG_FINAL, CONF_NAME: f"entry{index}"},
+            entry_id=f"entry{index}",
+        )
+        for index in range(2)
+    ]
+    for entry in entries:
+        entry.add_to_hass(hass)
+    loading = []
+
+    async def async_load(store: MeterStore):
+        loading.append(store.key)
+        return None
+
+    with patch.object(MeterStore, "async_load", autospec=True, side_effect=async_load):
+        assert await async_setup_component(hass, DOMAIN, {})
+        await hass.async_block_till_done()
+        # the entries took over the loads started by async_setup
+        assert loading == ["flexmeasure_entry0", "flexmeasure_entry1"]
+        assert hass.data[DOMAIN_DATA][PRELOADS] == {}
+
+        # a reload loads again
+        await hass.config_entries.async_reload("entry0")
+        await hass.async_block_till_done()
+        assert loading[-1] == "flexmeasure_entry0"
+        assert len(loading) == 3
+    assert hass.data[DOMAIN_DATA]["entry0"][COORDINATOR]
+
+
+async def test_reconfigure_in_place(hass: HomeAssistant, setup_entry):
+    entry, coordinator = await setup_entry()
+    day = coordinator.get_meter("day")
+    day_sensor = hass.states.get("sensor.test_configname_day")
+
+    day_config, year_config = MOCK_TIME_CONFIG_FINAL[CONF_SENSORS]
+    hour_config = {
+        **day_config,
+        CONF_NAME: "hour",
+        CONF_CRON: PREDEFINED_PERIODS["hour"],
+    }
+    hass.config_entries.async_update_entry(
+        entry,
+        options={**MOCK_TIME_CONFIG_FINAL, CONF_SENSORS: [day_config, hour_config]},
+    )
+    await hass.async_block_till_done()
+
+    # the entry wasn't reloaded, the unchanged meter and sensor kept running
+    assert hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR] is coordinator
+    assert coordinator.get_meter("day") is day
+    assert hass.states.get("sensor.test_configname_day") is day_sensor
+    assert coordinator.get_meter("hour").state == MeterState.MEASURING
+    assert hass.states.get("sensor.test_configname_hour")
+    assert hass.states.get("sensor.test_configname_year") is None
+    assert [meter.name for meter in coordinator.meters] == [
+        "test_configname_day",
+        "test_configname_hour",
+    ]
+
+    # a changed period replaces the meter, which continues from the old one
+    day._start_measured_value = 100
+    day_config = {**day_config, CONF_CRON: PREDEFINED_PERIODS["week"]}
+    hass.config_entries.async_update_entry(
+        entry,
+        options={**MOCK_TIME_CONFIG_FINAL, CONF_SENSORS: [day_config, hour_config]},
+    )
+    await hass.async_block_till_done()
+    assert coordinator.get_meter("day") is not day
+    assert coordinator.get_meter("day").measured_value >= 100
+
+    hass.config_entries.async_update_entry(
+        entry,
+        options={
+            **MOCK_TIME_CONFIG_FINAL,
+            CONF_SENSORS: [day_config, hour_config],
+            CONF_CONDITION: "{{ false }}",
+        },
+    )
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR] is coordinator
+    assert coordinator.get_meter("hour").state == MeterState.WAITING_FOR_CONDITION
+
+    # any other change reloads the entry
+    hass.config_entries.async_update_entry(
+        entry, options={**entry.options, CONF_NAME: "renamed"}
+    )
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR] is not coordinator
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,138 @@
+from unittest.mock import patch
+
+from custom_components.flexmeasure.const import CONF_JOURNAL
+from custom_components.flexmeasure.const import COORDINATOR
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.journal import Journal
+from custom_components.flexmeasure.journal import journal_path
+from custom_components.flexmeasure.meter import MeterState
+from custom_components.flexmeasure.store import decode
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import MOCK_TIME_CONFIG_FINAL
+
+
+def meter_data(measured_value: float) -> dict:
+    return {
+        "measured_value": measured_value,
+        "start_measured_value": 0,
+        "prev_measured_value": 0,
+        "session_start_reading": 1000.0,
+        "last_reset": 900.0,
+        "state": MeterState.MEASURING,
+    }
+
+
+async def test_append_and_replay(hass: HomeAssistant, hass_storage, tmp_path):
+    path = str(tmp_path / "test.journal")
+    journal = Journal(hass, Store(hass, 1, "test"), path)
+    assert await journal.async_load() is None
+
+    data = {"day": meter_data(1), "year": meter_data(1)}
+    await journal.async_save(data)
+    assert len((tmp_path / "test.journal").read_text().splitlines()) == 2
+
+    # only meters that were replaced are appended
+    data = {**data, "day": meter_data(2)}
+    await journal.async_save(data)
+    await journal.async_save(data)
+    lines = (tmp_path / "test.journal").read_text().splitlines()
+    assert lines[-1] == '["day",2,0,0,1000.0,900.0,"measuring"]'
+    assert len(lines) == 3
+    assert "test" not in hass_storage
+
+    loaded = await Journal(hass, Store(hass, 1, "test"), path).async_load()
+    assert loaded == data
+
+
+async def test_compaction(hass: HomeAssistant, hass_storage, tmp_path):
+    path = str(tmp_path / "test.journal")
+    journal = Journal(hass, Store(hass, 1, "test"), path, max_size=100)
+
+    for value in range(10):
+        await journal.async_save({"day": meter_data(value)})
+    assert journal.compactions == 3
+    assert hass_storage["test"]["data"]["day"]["measured_value"] == 8
+    assert len((tmp_path / "test.journal").read_text().splitlines()) == 1
+
+    loaded = await Journal(hass, Store(hass, 1, "test"), path).async_load()
+    assert loaded["day"]["measured_value"] == 9
+
+
+async def test_incomplete_record(hass: HomeAssistant, hass_storage, tmp_path):
+    path = str(tmp_path / "test.journal")
+    journal = Journal(hass, Store(hass, 1, "test"), path)
+    await journal.async_save({"day": meter_data(1)})
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('["day",2,0,0,10')
+
+    # the complete records are kept and the journal starts over
+    journal = Journal(hass, Store(hass, 1, "test"), path)
+    assert (await journal.async_load())["day"]["measured_value"] == 1
+    assert (tmp_path / "test.journal").read_text() == ""
+    assert hass_storage["test"]["data"]["day"]["measured_value"] == 1
+
+    await journal.async_save({"day": meter_data(3)})
+    loaded = await Journal(hass, Store(hass, 1, "test"), path).async_load()
+    assert loaded["day"]["measured_value"] == 3
+
+
+async def test_journal_option(hass: HomeAssistant, hass_storage, tmp_path, setup_entry):
+    hass.config.config_dir = str(tmp_path)
+    entry, coordinator = await setup_entry(
+        {**MOCK_TIME_CONFIG_FINAL, CONF_JOURNAL: True}
+    )
+    assert isinstance(coordinator._store, Journal)
+
+    # pending changes are appended when the coordinator stops
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert "flexmeasure_1234" not in hass_storage
+    with open(journal_path(hass, entry.entry_id), encoding="utf-8") as file:
+        assert len(file.read().splitlines()) == 2
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not (tmp_path / ".storage" / "flexmeasure_1234.journal").exists()
+
+
+async def test_stop_journal(hass: HomeAssistant, hass_storage, tmp_path, setup_entry):
+    hass.config.config_dir = str(tmp_path)
+    options = {**MOCK_TIME_CONFIG_FINAL, CONF_JOURNAL: True}
+    entry, coordinator = await setup_entry(options)
+    meter = coordinator.get_meter("day")
+    meter.prev_measured_value = 1234
+    meter.dirty = True
+    await coordinator._async_to_storage(flush=True)
+    assert "flexmeasure_1234" not in hass_storage
+
+    # the entry is reloaded without a journal, the journal is replayed into the file
+    hass.config_entries.async_update_entry(
+        entry, options={**options, CONF_JOURNAL: False}
+    )
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR]
+
+    assert coordinator.get_meter("day").prev_measured_value == 1234
+    assert not (tmp_path / ".storage" / "flexmeasure_1234.journal").exists()
+    stored = decode(hass_storage["flexmeasure_1234"]["data"])
+    assert stored["test_configname_day"]["prev_measured_value"] == 1234
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_interrupted_compaction(hass: HomeAssistant, hass_storage, tmp_path):
+    path = str(tmp_path / "test.journal")
+    journal = Journal(hass, Store(hass, 1, "test"), path, max_size=100)
+    await journal.async_save({"day": meter_data(1), "year": meter_data(1)})
+
+    # stopped after the snapshot was written, before the journal was emptied
+    with patch("custom_components.flexmeasure.journal._truncate"):
+        await journal.async_save({"day": meter_data(2), "year": meter_data(2)})
+    assert hass_storage["test"]["data"]["day"]["measured_value"] == 2
+    assert len((tmp_path / "test.journal").read_text().splitlines()) == 4
+
+    loaded = await Journal(hass, Store(hass, 1, "test"), path).async_load()
+    assert loaded == {"day": meter_data(2), "year": meter_data(2)}
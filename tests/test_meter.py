@@ -3,9 +3,11 @@ from datetime import datetime
 
 import pytest
 import pytz
+from custom_components.flexmeasure.meter import LazyTimeMeter
 from custom_components.flexmeasure.meter import Meter
 from custom_components.flexmeasure.meter import MeterState
 from custom_components.flexmeasure.period import Period
+from homeassistant.util import dt as dt_util
 
 START_PATTERN = "0 0 * * *"
 NAME = "24h"
@@ -24,8 +26,14 @@ def test_init(meter: Meter):
     assert meter._period.start == TZ.localize(start)
 
 
-def test_heartbeat(meter: Meter):
+def test_slots(meter: Meter):
+    assert not hasattr(meter, "__dict__")
+    assert not hasattr(meter._period, "__dict__")
+    assert not hasattr(LazyTimeMeter(NAME, meter._period), "__dict__")
+    assert meter.next_reset_timestamp == meter.next_reset.timestamp()
+
 
+def test_heartbeat(meter: Meter):
     # should trigger start()
     fake_now = TZ.localize(datetime(2022, 1, 1, 11, 5))
     meter._template_active = True
@@ -80,6 +88,103 @@ def test_template_update(meter: Meter):
     assert meter.measured_value == 5
 
 
+def test_reset_after_missed_periods(meter: Meter):
+    fake_now = TZ.localize(datetime(2022, 1, 1, 11, 5))
+    meter.on_template_change(fake_now, 123, True, tw_active=True)
+
+    fake_now = TZ.localize(datetime(2022, 1, 2, 0, 5))
+    meter.on_heartbeat(fake_now, 130, True)
+    assert meter.prev_measured_value == 7
+    meter.on_heartbeat(fake_now, 133, True)
+
+    # no update on the 3rd, what was measured since the 2nd isn't lost
+    fake_now = TZ.localize(datetime(2022, 1, 4, 0, 5))
+    meter.on_heartbeat(fake_now, 140, True)
+    assert meter.measured_value == 0
+    assert meter.prev_measured_value == 10
+    assert meter.last_reset == fake_now
+
+
+def test_reset_after_missed_periods_not_measuring(meter: Meter):
+    fake_now = TZ.localize(datetime(2022, 1, 1, 11, 5))
+    meter.on_template_change(fake_now, 123, True, tw_active=True)
+    meter.on_template_change(
+        TZ.localize(datetime(2022, 1, 1, 11, 10)), 130, False, tw_active=True
+    )
+    assert meter.measured_value == 7
+
+    # the meter stopped on the 1st, so nothing was measured on the 3rd
+    fake_now = TZ.localize(datetime(2022, 1, 4, 0, 5))
+    meter.on_heartbeat(fake_now, 140, True)
+    assert meter.measured_value == 0
+    assert meter.prev_measured_value == 0
+
+    # a single boundary keeps the total of the closed period
+    meter.on_template_change(fake_now, 140, True, tw_active=True)
+    meter.on_heartbeat(TZ.localize(datetime(2022, 1, 4, 12, 0)), 150, True)
+    meter.on_template_change(
+        TZ.localize(datetime(2022, 1, 4, 13, 0)), 150, False, tw_active=True
+    )
+    meter.on_heartbeat(TZ.localize(datetime(2022, 1, 5, 0, 5)), 150, True)
+    assert meter.prev_measured_value == 10
+
+
+def test_reset_after_stall():
+    fake_now = TZ.localize(datetime(2022, 1, 1, 10, 0))
+    meter = Meter(NAME, Period("*/5 * * * *", fake_now))
+    meter.on_template_change(fake_now, 0, True, tw_active=True)
+    meter.on_heartbeat(TZ.localize(datetime(2022, 1, 1, 10, 4)), 30, True)
+
+    # the heartbeat stalled across 10:05 and 10:10
+    fake_now = TZ.localize(datetime(2022, 1, 1, 10, 12))
+    meter.on_heartbeat(fake_now, 110, True)
+    assert meter.prev_measured_value == 110
+    assert meter.measured_value == 0
+    assert meter.last_reset == fake_now
+
+
+def test_dirty(meter: Meter):
+    assert meter.dirty is False
+
+    fake_now = TZ.localize(datetime(2022, 1, 1, 11, 5))
+    meter.on_template_change(fake_now, 123, True, tw_active=True)
+    assert meter.dirty is True
+
+    # unchanged readings don't change the persisted state
+    meter.dirty = False
+    meter.on_heartbeat(fake_now, 123, True)
+    assert meter.dirty is False
+
+    meter.on_heartbeat(fake_now, 125, True)
+    assert meter.dirty is True
+
+
+def test_lazy_time_meter(freezer):
+    fake_now = TZ.localize(datetime(2022, 1, 1, 11, 0))
+    freezer.move_to(fake_now)
+    meter = LazyTimeMeter(NAME, Period(START_PATTERN, fake_now))
+
+    meter.on_template_change(fake_now, fake_now.timestamp(), True, tw_active=True)
+    assert meter.state == MeterState.MEASURING
+
+    # the measured value is up to date without any update
+    freezer.tick(90)
+    assert meter.measured_value == 90
+    assert meter.dirty is True
+
+    fake_now = dt_util.now()
+    freezer.tick(30)
+    meter.on_template_change(fake_now, fake_now.timestamp(), False, tw_active=True)
+    assert meter.state == MeterState.WAITING_FOR_CONDITION
+    freezer.tick(60)
+    assert meter.measured_value == 90
+
+    # the value stays the same when read after a restart
+    data = Meter.to_dict(meter)
+    meter2 = Meter.from_dict(data, LazyTimeMeter(NAME, meter._period))
+    assert meter2.measured_value == 90
+
+
 def test_serializing(meter: Meter):
     fake_now = TZ.localize(datetime(2022, 1, 1, 11, 5))
     meter.on_template_change(fake_now, 123, True, tw_active=True)
@@ -1,5 +1,7 @@
 from datetime import datetime
 from datetime import timedelta
+from datetime import timezone
+from zoneinfo import ZoneInfo
 
 import pytz
 from custom_components.flexmeasure.const import PREDEFINED_PERIODS
@@ -28,10 +30,11 @@ def test_update_period():
 
     reset_called = False
 
-    def fake_reset(input_value):
+    def fake_reset(input_value, boundaries):
         nonlocal reset_called
         reset_called = True
         assert input_value == 123
+        assert boundaries == 1
 
     # period shouldn't be resetted when updated during period
     fake_now = datetime(2022, 1, 1, 11, 30)
@@ -54,3 +57,72 @@ def test_update_period():
     period.update(tznow4, fake_reset, 123)
     assert period.last_reset == tznow3
     assert reset_called is False
+
+
+def test_catch_up():
+    tznow = TZ.localize(datetime(2022, 1, 1, 10, 32))
+    period = Period(PREDEFINED_PERIODS["5m"], tznow)
+    resets = []
+
+    # a single reset after missing many periods
+    tznow = TZ.localize(datetime(2022, 1, 1, 13, 1))
+    assert period.update(tznow, lambda *args: resets.append(args), 123) == 30
+    assert resets == [(123, 30)]
+    assert period.start == TZ.localize(datetime(2022, 1, 1, 13, 0))
+    assert period.end == TZ.localize(datetime(2022, 1, 1, 13, 5))
+    assert period.last_reset == tznow
+
+    # exactly on a boundary
+    tznow = TZ.localize(datetime(2022, 1, 1, 13, 5))
+    assert period.update(tznow, lambda *args: resets.append(args), 123) == 1
+    assert period.start == tznow
+
+
+def test_catch_up_calendar():
+    tznow = TZ.localize(datetime(2022, 1, 15, 10, 30))
+    period = Period(PREDEFINED_PERIODS["month"], tznow)
+
+    tznow = TZ.localize(datetime(2022, 4, 2, 10, 30))
+    assert period.update(tznow, lambda *args: None, 0) == 3
+    assert period.start == TZ.localize(datetime(2022, 4, 1))
+
+
+def test_restore():
+    tznow = TZ.localize(datetime(2022, 1, 3, 10, 30))
+    period = Period(PREDEFINED_PERIODS["day"], tznow)
+
+    # restored from storage after two days of downtime
+    period.restore(TZ.localize(datetime(2022, 1, 1, 8, 0)))
+    assert period.end == TZ.localize(datetime(2022, 1, 2))
+    assert period.update(tznow, lambda *args: None, 0) == 2
+    assert period.end == TZ.localize(datetime(2022, 1, 4))
+
+
+def test_fold_hour():
+    # 02:00 - 03:00 occurs twice when DST ends, both are a period of an hour
+    tz = ZoneInfo("Europe/Amsterdam")
+    period = Period(
+        PREDEFINED_PERIODS["hour"], datetime(2022, 10, 30, 1, 30, tzinfo=tz)
+    )
+    resets = []
+
+    def reset(input_value, boundaries):
+        resets.append((period.last_reset, boundaries))
+
+    start = datetime(2022, 10, 29, 23, 30, tzinfo=timezone.utc).timestamp()
+    for minute in range(0, 180):
+        tznow = datetime.fromtimestamp(start + minute * 60, tz)
+        period.update(tznow, reset, 0)
+        assert period.start_timestamp <= tznow.timestamp() < period.end_timestamp
+        assert period.end_timestamp - period.start_timestamp == 3600
+
+    assert resets == [
+        (datetime(2022, 10, 30, 2, 0, tzinfo=tz), 1),
+        (datetime(2022, 10, 30, 2, 0, fold=1, tzinfo=tz), 1),
+        (datetime(2022, 10, 30, 3, 0, tzinfo=tz), 1),
+    ]
+    assert [reset.utcoffset() for reset, _ in resets] == [
+        timedelta(hours=2),
+        timedelta(hours=1),
+        timedelta(hours=1),
+    ]
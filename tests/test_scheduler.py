@@ -0,0 +1,86 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import Mock
+
+import homeassistant.util.dt as dt_util
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.const import SCHEDULER
+from custom_components.flexmeasure.scheduler import async_get_scheduler
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+
+def next_minute():
+    return dt_util.utcnow().replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+
+def mock_coordinator(name, due):
+    coordinator = Mock()
+    coordinator.name = name
+    coordinator.next_heartbeat.return_value = due
+    coordinator.async_on_heartbeat = AsyncMock()
+    return coordinator
+
+
+async def test_shared_scheduler(hass: HomeAssistant):
+    scheduler = async_get_scheduler(hass)
+    assert hass.data[DOMAIN_DATA][SCHEDULER] is scheduler
+    assert async_get_scheduler(hass) is scheduler
+
+
+async def test_batch_heartbeat(hass: HomeAssistant):
+    due = next_minute()
+    coordinator1 = mock_coordinator("one", due)
+    coordinator2 = mock_coordinator("two", due)
+
+    scheduler = async_get_scheduler(hass)
+    unregister1 = scheduler.async_register(coordinator1)
+    unregister2 = scheduler.async_register(coordinator2)
+    assert scheduler.coordinators == 2
+
+    # both coordinators are due, so both run on the same tick
+    due2 = due + timedelta(minutes=1)
+    coordinator1.next_heartbeat.return_value = due2
+    coordinator2.next_heartbeat.return_value = due2
+    async_fire_time_changed(hass, due)
+    await hass.async_block_till_done()
+    coordinator1.async_on_heartbeat.assert_awaited_once()
+    coordinator2.async_on_heartbeat.assert_awaited_once()
+
+    # an unregistered coordinator does not run anymore
+    unregister2()
+    coordinator1.next_heartbeat.return_value = due2 + timedelta(minutes=1)
+    async_fire_time_changed(hass, due2)
+    await hass.async_block_till_done()
+    assert coordinator1.async_on_heartbeat.await_count == 2
+    assert coordinator2.async_on_heartbeat.await_count == 1
+
+    unregister1()
+    assert scheduler.coordinators == 0
+
+
+async def test_failing_coordinator_does_not_block_others(hass: HomeAssistant):
+    due = next_minute()
+    failing = mock_coordinator("failing", due)
+    failing.async_on_heartbeat.side_effect = Exception("boom")
+    healthy = mock_coordinator("healthy", due)
+
+    scheduler = async_get_scheduler(hass)
+    unregister_failing = scheduler.async_register(failing)
+    unregister_healthy = scheduler.async_register(healthy)
+
+    due2 = due + timedelta(minutes=1)
+    failing.next_heartbeat.return_value = due2
+    healthy.next_heartbeat.return_value = due2
+    async_fire_time_changed(hass, due)
+    await hass.async_block_till_done()
+    healthy.async_on_heartbeat.assert_awaited_once()
+
+    # the failing coordinator is rescheduled as well
+    async_fire_time_changed(hass, due2)
+    await hass.async_block_till_done()
+    assert failing.async_on_heartbeat.await_count == 2
+    assert healthy.async_on_heartbeat.await_count == 2
+
+    unregister_failing()
+    unregister_healthy()
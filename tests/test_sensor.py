@@ -1 +1,121 @@
 # test timezones
+from datetime import timedelta
+
+import homeassistant.util.dt as dt_util
+import pytest
+from custom_components.flexmeasure.const import ATTR_NEXT_RESET
+from custom_components.flexmeasure.const import ATTR_PREV
+from custom_components.flexmeasure.const import ATTR_STATUS
+from custom_components.flexmeasure.const import CONF_CONDITION
+from custom_components.flexmeasure.const import CONF_FORCE_REFRESH_INTERVAL
+from custom_components.flexmeasure.const import CONF_REDUCE_RECORDING
+from custom_components.flexmeasure.const import CONF_STATE_RESOLUTION
+from custom_components.flexmeasure.const import DOMAIN
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.const import SENSORS
+from custom_components.flexmeasure.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.flexmeasure.meter import MeterState
+from custom_components.flexmeasure.recorder import exclude_attributes
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_TIME_CONFIG_FINAL
+
+
+async def test_skip_unchanged_writes(hass: HomeAssistant, setup_entry):
+    entry, coordinator = await setup_entry()
+    sensor = hass.data[DOMAIN_DATA][entry.entry_id][SENSORS][0]
+    writes = sensor.writes
+
+    # nothing visible changed
+    coordinator._update_listeners()
+    assert sensor.writes == writes
+    assert sensor.skipped_writes == 1
+
+    coordinator.get_meter("day").measured_value += 10
+    coordinator._update_listeners()
+    assert sensor.writes == writes + 1
+    assert hass.states.get("sensor.test_configname_day").state == str(
+        round(coordinator.get_meter("day").measured_value)
+    )
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["sensors"]["test_configname_day"] == {
+        "writes": writes + 1,
+        "skipped_writes": 1,
+    }
+
+
+async def test_force_refresh(hass: HomeAssistant, setup_entry):
+    entry, coordinator = await setup_entry(
+        {**MOCK_TIME_CONFIG_FINAL, CONF_FORCE_REFRESH_INTERVAL: 0}
+    )
+    sensor = hass.data[DOMAIN_DATA][entry.entry_id][SENSORS][0]
+    assert coordinator.get_meter("day").state == MeterState.MEASURING
+
+    writes = sensor.writes
+    coordinator._update_listeners()
+    assert sensor.writes == writes + 1
+    assert sensor.skipped_writes == 0
+
+
+async def test_state_resolution(hass: HomeAssistant, setup_entry):
+    entry, coordinator = await setup_entry(
+        {
+            **MOCK_TIME_CONFIG_FINAL,
+            # not measuring, so heartbeats don't change the value
+            CONF_CONDITION: "{{ false }}",
+            CONF_STATE_RESOLUTION: 300,
+        }
+    )
+    sensor = hass.data[DOMAIN_DATA][entry.entry_id][SENSORS][0]
+    meter = coordinator.get_meter("day")
+    state = hass.states.get("sensor.test_configname_day").state
+
+    # value changes within the resolution are written once it passed
+    meter.measured_value += 10
+    coordinator._update_listeners()
+    meter.measured_value += 10
+    coordinator._update_listeners()
+    assert hass.states.get("sensor.test_configname_day").state == state
+
+    sensor._written_at -= 300
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=301))
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.test_configname_day").state == str(
+        round(meter.measured_value)
+    )
+
+    # other changes are written immediately
+    meter.measured_value += 10
+    meter.prev_measured_value = 5
+    coordinator._update_listeners()
+    state = hass.states.get("sensor.test_configname_day")
+    assert state.state == str(round(meter.measured_value))
+    assert state.attributes[ATTR_PREV] == 5
+
+
+@pytest.mark.parametrize(
+    "config,excluded",
+    [
+        ({}, set()),
+        ({DOMAIN: {}}, set()),
+        (
+            {DOMAIN: {CONF_REDUCE_RECORDING: True}},
+            {ATTR_NEXT_RESET, ATTR_PREV, ATTR_STATUS},
+        ),
+    ],
+)
+async def test_exclude_attributes(hass: HomeAssistant, config, excluded):
+    # a setting of the integration, an entry's option doesn't affect the others
+    entry = MockConfigEntry(
+        domain=DOMAIN, options={**MOCK_TIME_CONFIG_FINAL, CONF_REDUCE_RECORDING: True}
+    )
+    entry.add_to_hass(hass)
+    assert await async_setup_component(hass, DOMAIN, config)
+    await hass.async_block_till_done()
+    assert exclude_attributes(hass) == excluded
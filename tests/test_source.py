@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.const import SOURCES
+from custom_components.flexmeasure.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.flexmeasure.meter import MeterState
+from custom_components.flexmeasure.source import SourceStatus
+from custom_components.flexmeasure.source import SourceTracker
+from homeassistant.core import HomeAssistant
+from homeassistant.core import StateMachine
+
+from .const import MOCK_SOURCE_CONFIG_FINAL
+
+
+async def test_tracker(hass: HomeAssistant):
+    hass.states.async_set("sensor.energy", "10")
+    tracker = SourceTracker(hass, ["sensor.energy", "sensor.missing"])
+    tracker.async_start()
+    assert tracker.readings() == {
+        "sensor.energy": 10.0,
+        "sensor.missing": SourceStatus.MISSING,
+    }
+
+    hass.states.async_set("sensor.energy", "unavailable")
+    await hass.async_block_till_done()
+    assert tracker.reading("sensor.energy") == SourceStatus.UNAVAILABLE
+    hass.states.async_set("sensor.energy", "rubbish")
+    await hass.async_block_till_done()
+    assert tracker.reading("sensor.energy") == SourceStatus.INVALID
+
+    # the last valid value is kept, and every invalid state is counted
+    source = tracker.sources["sensor.energy"]
+    assert source.value == 10.0
+    assert source.invalid_readings == 2
+
+    hass.states.async_set("sensor.missing", "2.5")
+    await hass.async_block_till_done()
+    assert tracker.reading("sensor.missing") == 2.5
+
+    hass.states.async_remove("sensor.missing")
+    await hass.async_block_till_done()
+    assert tracker.reading("sensor.missing") == SourceStatus.MISSING
+    assert tracker.sources["sensor.missing"].invalid_readings == 2
+
+    tracker.async_stop()
+    hass.states.async_set("sensor.energy", "20")
+    await hass.async_block_till_done()
+    assert tracker.reading("sensor.energy") == SourceStatus.INVALID
+
+
+async def test_missing_source(hass: HomeAssistant, setup_entry):
+    entry, coordinator = await setup_entry(MOCK_SOURCE_CONFIG_FINAL)
+    assert coordinator.get_meter("day").state is None
+
+    # updates read the tracked value, the state machine isn't queried
+    hass.states.async_set("sensor.energy", "100")
+    await hass.async_block_till_done()
+    with patch.object(StateMachine, "get", autospec=True) as get:
+        await coordinator.async_on_heartbeat()
+        get.assert_not_called()
+    assert coordinator.last_reading == 100.0
+    assert coordinator.get_meter("day").state == MeterState.MEASURING
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["sources"]["sensor.energy"] == {
+        "status": "valid",
+        "value": 100.0,
+        "invalid_readings": 1,
+    }
+
+    # the listener is removed with the entry
+    tracker = hass.data[DOMAIN_DATA][entry.entry_id][SOURCES]
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    hass.states.async_set("sensor.energy", "110")
+    await hass.async_block_till_done()
+    assert tracker.reading("sensor.energy") == 100.0
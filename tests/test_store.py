@@ -0,0 +1,145 @@
+import json
+from datetime import timedelta
+
+from custom_components.flexmeasure.const import CONF_SHARED_STORE
+from custom_components.flexmeasure.const import COORDINATOR
+from custom_components.flexmeasure.const import DOMAIN
+from custom_components.flexmeasure.const import DOMAIN_DATA
+from custom_components.flexmeasure.meter import MeterState
+from custom_components.flexmeasure.store import decode
+from custom_components.flexmeasure.store import encode
+from custom_components.flexmeasure.store import STORAGE_VERSION
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import storage
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .const import MOCK_TIME_CONFIG_FINAL
+
+SHARED_CONFIG = {**MOCK_TIME_CONFIG_FINAL, CONF_SHARED_STORE: True}
+
+
+def stored_meter(measured_value: float) -> dict:
+    return {
+        "measured_value": measured_value,
+        "start_measured_value": measured_value,
+        "prev_measured_value": 0,
+        "session_start_reading": dt_util.utcnow().timestamp(),
+        "last_reset": dt_util.utcnow().timestamp(),
+        "state": MeterState.MEASURING,
+    }
+
+
+def test_encode():
+    meters = {f"meter{index}": stored_meter(index) for index in range(100)}
+    columns = encode(meters)
+    assert columns["state"] == [1] * 100
+    assert decode(columns) == meters
+
+    # about half the size of a dict per meter
+    assert len(json.dumps(columns)) < len(json.dumps(meters)) / 2
+
+
+async def test_migrate_version_1(hass: HomeAssistant, hass_storage):
+    hass_storage["flexmeasure_1234"] = {
+        "version": 1,
+        "key": "flexmeasure_1234",
+        "data": {
+            "test_configname_day": stored_meter(100),
+            "test_configname_year": stored_meter(200),
+        },
+    }
+    entry = MockConfigEntry(
+        domain=DOMAIN, options=MOCK_TIME_CONFIG_FINAL, entry_id="1234"
+    )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR]
+
+    assert round(coordinator.get_meter("year").measured_value) == 200
+    stored = hass_storage["flexmeasure_1234"]
+    assert stored["version"] == STORAGE_VERSION
+    assert stored["data"]["name"] == ["test_configname_day", "test_configname_year"]
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_migrate_entry_file(hass: HomeAssistant, hass_storage):
+    hass_storage["flexmeasure_1234"] = {
+        "version": 1,
+        "key": "flexmeasure_1234",
+        "data": {
+            "test_configname_day": stored_meter(100),
+            "test_configname_year": stored_meter(200),
+        },
+    }
+    entry = MockConfigEntry(domain=DOMAIN, options=SHARED_CONFIG, entry_id="1234")
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR]
+
+    assert round(coordinator.get_meter("day").measured_value) == 100
+    assert "flexmeasure_1234" not in hass_storage
+    assert "test_configname_day" in decode(hass_storage[DOMAIN]["data"]["1234"])
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert "1234" not in hass_storage[DOMAIN]["data"]
+
+
+async def test_combined_writes(hass: HomeAssistant, hass_storage):
+    for index in range(3):
+        MockConfigEntry(
+            domain=DOMAIN,
+            options={**SHARED_CONFIG, CONF_NAME: f"entry{index}"},
+            entry_id=f"entry{index}",
+        ).add_to_hass(hass)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    storage.Store._async_write_data.reset_mock()
+
+    # the delayed saves of all entries are written at once
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    writes = [
+        call.args[0].key
+        for call in storage.Store._async_write_data.call_args_list
+        if call.args[0].key.startswith(DOMAIN)
+    ]
+    assert writes == [DOMAIN]
+    assert sorted(hass_storage[DOMAIN]["data"]) == ["entry0", "entry1", "entry2"]
+    assert not any(key.startswith("flexmeasure_") for key in hass_storage)
+
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_stop_sharing(hass: HomeAssistant, hass_storage, setup_entry):
+    entry, coordinator = await setup_entry(SHARED_CONFIG)
+    meter = coordinator.get_meter("day")
+    meter.prev_measured_value = 1234
+    meter.dirty = True
+    # a delayed save, that's still pending when the option is changed
+    await coordinator._async_to_storage()
+
+    # the entry is reloaded with its own file, its data is moved out of the shared one
+    hass.config_entries.async_update_entry(
+        entry, options={**SHARED_CONFIG, CONF_SHARED_STORE: False}
+    )
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN_DATA][entry.entry_id][COORDINATOR]
+
+    assert coordinator.get_meter("day").prev_measured_value == 1234
+    assert "1234" not in hass_storage[DOMAIN]["data"]
+    stored = decode(hass_storage["flexmeasure_1234"]["data"])
+    assert stored["test_configname_day"]["prev_measured_value"] == 1234
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -1,4 +1,5 @@
 from datetime import datetime
+from datetime import timedelta
 
 import pytz
 from custom_components.flexmeasure.time_window import TimeWindow
@@ -78,3 +79,72 @@ def test_active_with_equal_window():
 
     fake_now = TZ.localize(datetime(2022, 1, 2, 4, 10))  # monday after start TW
     assert tw.is_active(fake_now) is True
+
+
+def test_next_change():
+    tw = TimeWindow(["0"], "22:00:00", "04:00:00")  # monday
+
+    fake_now = TZ.localize(datetime(2022, 1, 1, 10, 30))  # = saturday
+    assert tw.next_change(fake_now) == TZ.localize(datetime(2022, 1, 3, 22, 0))
+
+    fake_now = TZ.localize(datetime(2022, 1, 3, 23, 30))  # = monday in TW
+    edge = tw.next_change(fake_now)
+    assert edge == TZ.localize(datetime(2022, 1, 4, 4, 0, 1))
+    assert tw.is_active(edge - timedelta(seconds=1)) is True
+    assert tw.is_active(edge) is False
+
+
+def test_next_change_dst():
+    tw = TimeWindow(["6"], "03:00:00", "05:00:00")  # sunday
+
+    fake_now = TZ.localize(datetime(2022, 3, 26, 12, 0))  # saturday before DST
+    edge = tw.next_change(fake_now)
+    assert edge == TZ.localize(datetime(2022, 3, 27, 3, 0))
+    assert edge - fake_now == timedelta(hours=14)
+
+
+def test_multiple_windows():
+    # weekday mornings and evenings, and the whole weekend
+    tw = TimeWindow(
+        ["0", "1", "2", "3", "4"],
+        "07:00:00",
+        "09:00:00",
+        [
+            (["0", "1", "2", "3", "4"], "17:00:00", "21:00:00"),
+            (["5", "6"], "00:00:00", "00:00:00"),
+        ],
+    )
+
+    assert tw.is_active(TZ.localize(datetime(2022, 1, 3, 8, 0))) is True
+    assert tw.is_active(TZ.localize(datetime(2022, 1, 3, 12, 0))) is False
+    assert tw.is_active(TZ.localize(datetime(2022, 1, 3, 18, 0))) is True
+    assert tw.is_active(TZ.localize(datetime(2022, 1, 1, 12, 0))) is True
+
+    # the weekend continues into monday morning
+    fake_now = TZ.localize(datetime(2022, 1, 1, 12, 0))  # saturday
+    assert tw.next_change(fake_now) == TZ.localize(datetime(2022, 1, 3, 0, 0))
+    fake_now = TZ.localize(datetime(2022, 1, 3, 0, 0))
+    assert tw.next_change(fake_now) == TZ.localize(datetime(2022, 1, 3, 7, 0))
+
+
+def test_next_change_matches_is_active():
+    tw = TimeWindow(
+        ["0", "2", "6"],
+        "22:00:00",
+        "04:00:00",
+        [(["1", "6"], "12:00:00", "13:30:00"), (["3"], "10:00:00", "10:00:00")],
+    )
+    prev = TZ.localize(datetime(2022, 1, 3, 0, 0, 30))
+    edge = tw.next_change(prev)
+    for _ in range(2 * 7 * 24 * 60):
+        now = prev + timedelta(minutes=1)
+        # the state changes exactly when an edge is passed
+        assert (tw.is_active(now) != tw.is_active(prev)) == (prev < edge <= now)
+        if edge <= now:
+            edge = tw.next_change(now)
+        prev = now
+
+
+def test_always_active():
+    tw = TimeWindow(["0", "1", "2", "3", "4", "5", "6"], "00:00:00", "00:00:00")
+    assert tw.next_change(TZ.localize(datetime(2022, 1, 3, 0, 0))) is None
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+from custom_components.flexmeasure.const import CONF_SENSORS
+from custom_components.flexmeasure.const import CONF_SOURCES
+from custom_components.flexmeasure.util import create_renderer
+from custom_components.flexmeasure.util import invalid_sources
+from custom_components.flexmeasure.util import RENDER_CACHE_SIZE
+from custom_components.flexmeasure.util import source_sensors
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.template import Template
+
+
+async def test_renderer_caches_pure_templates(hass: HomeAssistant):
+    render = create_renderer(hass, "{{ value * 2 }}")
+    with patch.object(
+        Template, "async_render", autospec=True, side_effect=Template.async_render
+    ) as async_render:
+        assert render(21) == "42"
+        assert render(21) == "42"
+        assert async_render.call_count == 1
+
+        for value in range(RENDER_CACHE_SIZE + 1):
+            render(value)
+        # 21 was evicted
+        render(21)
+        assert async_render.call_count == RENDER_CACHE_SIZE + 3
+
+
+async def test_renderer_bypasses_cache_for_states(hass: HomeAssistant):
+    hass.states.async_set("sensor.factor", "2")
+    render = create_renderer(hass, "{{ value * states('sensor.factor') | int(0) }}")
+    assert render(21) == "42"
+
+    hass.states.async_set("sensor.factor", "3")
+    assert render(21) == "63"
+
+
+async def test_renderer_bypasses_cache_for_time(hass: HomeAssistant):
+    render = create_renderer(hass, "{{ value if now().year > 2000 else 0 }}")
+    with patch.object(
+        Template, "async_render", autospec=True, side_effect=Template.async_render
+    ) as async_render:
+        assert render(21) == "21"
+        assert render(21) == "21"
+        assert async_render.call_count == 2
+
+
+def test_source_sensors():
+    options = {CONF_SENSORS: [{CONF_NAME: "day"}, {CONF_NAME: "year"}]}
+    assert source_sensors(options) == [
+        (None, {CONF_NAME: "day"}),
+        (None, {CONF_NAME: "year"}),
+    ]
+
+    options[CONF_SOURCES] = ["sensor.kitchen", "sensor.garage"]
+    assert [
+        (source, sensor[CONF_NAME]) for source, sensor in source_sensors(options)
+    ] == [
+        ("sensor.kitchen", "kitchen_day"),
+        ("sensor.kitchen", "kitchen_year"),
+        ("sensor.garage", "garage_day"),
+        ("sensor.garage", "garage_year"),
+    ]
+
+
+def test_invalid_sources():
+    assert invalid_sources(["sensor.kitchen", "sensor.garage"]) == []
+    # an entity registry id, and two sources that would name their sensors alike
+    assert invalid_sources(
+        ["sensor.kitchen", "3a4f2b1c", "input_number.kitchen", "sensor.garage"]
+    ) == ["sensor.kitchen", "3a4f2b1c", "input_number.kitchen"]